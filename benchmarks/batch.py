@@ -0,0 +1,46 @@
+"""Mesure du temps d'un balayage de paramètres lancé avec ``run_batch`` en fonction du nombre de processus, et de
+l'accélération par rapport à un seul processus. Les scénarios étant indépendants, l'accélération doit être proche du
+nombre de processus tant qu'il ne dépasse pas le nombre de cœurs. Vérifie aussi que les résultats ne dépendent pas du
+nombre de processus, et qu'un balayage des paramètres de l'IDM, lus dans la configuration à la création des voitures,
+change bien les résultats.
+"""
+
+import os
+from time import perf_counter
+
+from traffsimpy import CarFactory, TrafficLight, Sensor, run_batch
+
+
+def corridor(sim, freq):
+    """Deux routes à la suite, la seconde avec un feu et un capteur."""
+    sim.create_roads([{"id": 1, "s": (0, 400), "e": (700, 400), "car_factory": CarFactory(freq)},
+                      {"id": 2, "s": 1, "e": (1400, 400), "sign": TrafficLight(0), "sensors": Sensor(0.5, ["v"])}])
+    sim.set_road_graph({1: 2})
+
+
+if __name__ == "__main__":
+    grid = {"freq": [1.5, 2, [1, 3], [2, 4]], "tl_red_delay": [10, 20]}
+    seeds = range(4)
+    n_cpus = os.cpu_count()
+
+    print(f"{len(grid['freq']) * len(grid['tl_red_delay']) * len(seeds)} scénarios, {n_cpus} cœurs")
+    print(f"{'processus':>9} | {'temps (s)':>9} | {'accélération':>12}")
+
+    reference = None
+    for processes in sorted({1, 2, 4, 8, 16, 32, 64, n_cpus} & set(range(1, n_cpus + 1))):
+        start = perf_counter()
+        res = run_batch(corridor, grid, 30, seeds=seeds, processes=processes)
+        duration = perf_counter() - start
+
+        if reference is None:
+            reference = res, duration
+        assert res.equals(reference[0]), "les résultats dépendent du nombre de processus"
+
+        print(f"{processes:>9} | {duration:9.2f} | {reference[1] / duration:12.1f}")
+
+    # les paramètres de l'IDM de la configuration doivent atteindre les voitures créées pendant la simulation
+    idm_grid = {"freq": [2], "t_react": [0.5, 3.0], "a_max": [0.5, 3.0]}
+    res = run_batch(corridor, idm_grid, 25, processes=1)
+    mean_v = res.groupby(["t_react", "a_max"])["v (m/s)"].mean()
+    assert mean_v.nunique() == len(mean_v), "le balayage des paramètres de l'IDM ne change pas les résultats"
+    print(f"balayage de l'IDM : vitesses moyennes {', '.join(f'{v:.2f}' for v in mean_v)} m/s")
@@ -0,0 +1,92 @@
+"""Mesure du temps de la phase "broad" de détection des collisions en fonction du nombre de voitures, pour la recherche
+naïve de tous les couples, pour la grille uniforme et pour le balayage incrémental (*sweep and prune*), à densité de
+trafic constante. Le balayage est mesuré en régime établi, les voitures avançant un peu entre deux mesures. Vérifie aussi
+que les trois méthodes renvoient les mêmes couples.
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # aucune fenêtre n'est nécessaire
+
+from time import perf_counter
+import numpy as np
+
+from traffsimpy import Simulation, Car
+
+
+def build_network(n_cars: int, seed: int = 0):
+    """Crée une simulation en grille de routes qui se croisent, avec ``n_cars`` voitures réparties au hasard, et renvoie
+    la simulation et ses voitures."""
+    rng = np.random.default_rng(seed)
+    n_roads = max(2, round(np.sqrt(n_cars) / 2))  # nombre de routes dans chaque direction
+    side = 60 * n_roads  # côté du quadrillage en pixels, pour garder la même densité de voitures
+
+    sim = Simulation("Benchmark broad phase", side, side)
+    road_list = []
+    for k in range(n_roads):
+        x = (k + 0.5) * side / n_roads
+        road_list.append({"s": (0, x), "e": (side, x), "ht": True})
+        road_list.append({"s": (x, 0), "e": (x, side), "ht": True})
+    roads = sim.create_roads(road_list)
+
+    for _ in range(n_cars):
+        road = roads[rng.integers(len(roads))]
+        car = Car(v=rng.uniform(0, 14))
+        car.d = rng.uniform(0, road.length)
+        road.new_car(car)
+
+    for road in roads:
+        road.cars.sort(key=lambda car: -car.d)
+
+    return sim, sim.cars_in_heavy_traffic_area()
+
+
+def move_cars(cars: list[Car], dd: float = 0.3):
+    """Fait avancer chaque voiture de ``dd`` pixels sur sa route, comme entre deux images."""
+    for car in cars:
+        car.d = min(car.d + dd, car.road.length)
+        car.pos = car.road.start + car.road.vd * car.d
+        _ = car.aabb
+
+
+def sweep_and_prune_time(sim: Simulation, cars: list[Car], repeat: int = 3):
+    """Renvoie le meilleur temps du balayage incrémental en régime établi, et son dernier résultat."""
+    sim.sweep_and_prune_broad_phase(cars)  # construction initiale
+    best = float("inf")
+    for _ in range(repeat):
+        move_cars(cars)
+        start = perf_counter()
+        res = sim.sweep_and_prune_broad_phase(cars)
+        best = min(best, perf_counter() - start)
+    return best, res
+
+
+def timeit(func, *args, repeat: int = 3):
+    """Renvoie le meilleur temps d'exécution de ``func(*args)`` et son résultat."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        res = func(*args)
+        best = min(best, perf_counter() - start)
+    return best, res
+
+
+if __name__ == "__main__":
+    print(f"{'voitures':>9} | {'couples':>8} | {'naïve (ms)':>11} | {'grille (ms)':>11} | {'balayage (ms)':>13}")
+
+    for n_cars in (50, 100, 200, 400, 800, 1600, 3200):
+        sim, cars = build_network(n_cars)
+        for car in cars:
+            _ = car.aabb  # la géométrie est calculée avant les mesures
+
+        sap_time, sap_pairs = sweep_and_prune_time(sim, cars)
+        grid_time, grid_pairs = timeit(Simulation.grid_broad_phase, cars)
+        assert sap_pairs == grid_pairs, "le balayage et la grille ne renvoient pas les mêmes couples"
+
+        if n_cars <= 1600:
+            naive_time, naive_pairs = timeit(Simulation.naive_broad_phase, cars, repeat=1)
+            assert naive_pairs == grid_pairs, "les méthodes ne renvoient pas les mêmes couples"
+            naive_str = f"{1000 * naive_time:11.2f}"
+        else:
+            naive_str = f"{'-':>11}"
+
+        print(f"{n_cars:>9} | {len(grid_pairs):>8} | {naive_str} | {1000 * grid_time:11.2f} | {1000 * sap_time:13.2f}")
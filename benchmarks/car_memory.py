@@ -0,0 +1,44 @@
+"""Mesure de la mémoire occupée par voiture : pour des voitures seulement créées (avec leur entrée dans le registre de
+la simulation), puis ajoutées à une route, puis après le calcul de leur géométrie, gardée jusqu'à leur prochain
+déplacement. Le nombre de voitures peut être donné en argument (100 000 par défaut).
+"""
+
+import sys
+import tracemalloc
+
+from traffsimpy import Simulation, Car
+
+
+def traced_bytes_per_car(func, n):
+    """Renvoie la mémoire allouée par ``func`` et toujours occupée ensuite, divisée par ``n``."""
+    start = tracemalloc.get_traced_memory()[0]
+    res = func()
+    return (tracemalloc.get_traced_memory()[0] - start) / n, res
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    sim = Simulation("Mémoire", 1440, 820)
+    sim.create_roads([{"id": 1, "s": (0, 0), "e": (1e9, 0)}])
+    road = sim.roads[0]
+
+    tracemalloc.start()
+
+    created, cars = traced_bytes_per_car(lambda: [Car() for _ in range(n)], n)
+
+    def add_to_road():
+        for k, car in enumerate(reversed(cars)):
+            car.d = 10 * k  # voitures espacées, la première créée en tête
+            road.new_car(car)
+
+    on_road, _ = traced_bytes_per_car(add_to_road, n)
+    with_geometry, _ = traced_bytes_per_car(road.update_cars_geometry, n)
+
+    tracemalloc.stop()
+
+    print(f"{n} voitures")
+    print(f"créées : {created:8.0f} octets par voiture")
+    print(f"sur une route : {on_road:8.0f} octets par voiture en plus")
+    print(f"avec géométrie : {with_geometry:8.0f} octets par voiture en plus")
+    print(f"total : {created + on_road + with_geometry:8.0f} octets par voiture")
@@ -0,0 +1,43 @@
+"""Mesure du temps d'import de traffsimpy dans un nouvel interpréteur, et vérification que l'import n'affiche rien et ne
+charge ni l'affichage (pygame), ni les graphes (matplotlib), ni les DataFrame (pandas), ni yaml, ni webcolors, qui ne
+sont importés qu'à leur première utilisation. Le script échoue si l'une de ces vérifications échoue ou si le meilleur
+temps d'import dépasse le budget donné en argument (en secondes, 1 par défaut), pour détecter les régressions.
+"""
+
+import subprocess
+import sys
+
+LAZY_MODULES = ("pygame", "matplotlib", "pandas", "yaml", "webcolors")  # modules à ne pas importer avec traffsimpy
+
+# programme exécuté par chaque interpréteur : affiche le temps d'import et les modules chargés à tort
+PROGRAM = f"""
+import sys
+from time import perf_counter
+start = perf_counter()
+import traffsimpy
+duration = perf_counter() - start
+loaded = [name for name in {LAZY_MODULES!r} if name in sys.modules]
+print(duration, *loaded, file=sys.stderr)
+"""
+
+
+def import_time():
+    """Renvoie le temps d'import de traffsimpy dans un nouvel interpréteur, ce qu'il a affiché et les modules chargés à
+    tort."""
+    res = subprocess.run([sys.executable, "-c", PROGRAM], capture_output=True, text=True, check=True)
+    duration, *loaded = res.stderr.split()
+    return float(duration), res.stdout, loaded
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+
+    times = []
+    for _ in range(5):
+        duration, output, loaded = import_time()
+        assert not output, f"l'import de traffsimpy affiche : {output!r}"
+        assert not loaded, f"l'import de traffsimpy charge : {', '.join(loaded)}"
+        times.append(duration)
+
+    print(f"import de traffsimpy : meilleur {1000 * min(times):.1f} ms, médian {1000 * sorted(times)[2]:.1f} ms")
+    assert min(times) <= budget, f"l'import de traffsimpy dure plus de {budget} s"
@@ -0,0 +1,58 @@
+"""Vérification que deux simulations de configurations différentes, construites en alternance dans un même thread,
+donnent les mêmes résultats que construites et lancées l'une après l'autre : les routes, avec leurs CarFactory, feux et
+capteurs créés dans la liste des routes, appartiennent à la simulation dont la méthode est appelée, et non à la dernière
+créée. Les résultats d'une simulation sont aussi calculés alors que l'autre est la simulation active.
+"""
+
+from traffsimpy import Simulation, CarFactory, TrafficLight, Sensor, simulation_configuration
+
+
+CONFIGS = {"a": simulation_configuration.replace(scale=10), "b": simulation_configuration.replace(scale=5, v_max=8)}
+DURATION = 40  # s
+
+
+def road_list():
+    """Deux routes à la suite, la seconde avec un feu et des capteurs de valeurs instantanées et de fonctions du temps,
+    créés à chaque appel."""
+    return [{"id": 1, "s": (0, 300), "e": (500, 300), "car_factory": CarFactory(2)},
+            {"id": 2, "s": 1, "e": (1000, 300), "sign": TrafficLight(0),
+             "sensors": [Sensor(0.5, ["v", "a"]), Sensor(0.8, ["v(t)"])]}]
+
+
+def sensors_results(sim: Simulation):
+    """Calcule et renvoie les résultats des capteurs de la simulation."""
+    sim.compute_sensors_results()
+    return [sensor.df for road in sim.roads for sensor in road.sensors]
+
+
+if __name__ == "__main__":
+    # référence : chaque simulation construite et lancée seule
+    reference = {}
+    for name, config in CONFIGS.items():
+        sim = Simulation(name, 1000, 600, config=config)
+        sim.create_roads(road_list())
+        sim.set_road_graph({1: 2, 2: None})
+        sim.start_loop_no_display(DURATION)
+        reference[name] = sensors_results(sim)
+
+    # construction en alternance : chaque simulation est créée avant que les routes de l'autre le soient
+    sims = {name: Simulation(name, 1000, 600, config=config) for name, config in CONFIGS.items()}
+    for sim in sims.values():
+        sim.create_roads(road_list())
+    for sim in sims.values():
+        sim.set_road_graph({1: 2, 2: None})
+
+    for sim in sims.values():
+        for road in sim.roads:
+            assert road.simulation is sim, "une route appartient à une autre simulation"
+            for obj in [road, road.car_factory, road.sign, *road.sensors]:
+                assert sim.dynamic_data["ids"].get(obj.id) is obj, f"{obj} n'est pas dans le registre de sa simulation"
+
+    for sim in sims.values():
+        sim.start_loop_no_display(DURATION)
+
+    for name, sim in reversed(sims.items()):  # résultats de la première calculés après le lancement de la seconde
+        results = sensors_results(sim)
+        assert len(results) == len(reference[name]) and all(res.equals(ref) for res, ref in zip(results, reference[name])), \
+            f"les résultats de la simulation {name} dépendent de l'ordre de construction"
+        print(f"simulation {name} (échelle {sim.config.scale}) : {[len(res) for res in results]} lignes de résultats")
@@ -0,0 +1,41 @@
+"""Mesure du temps de la phase "narrow" de détection des collisions en fonction du nombre de voitures, couple par couple et
+pour tous les couples à la fois, sur le même réseau que ``broad_phase.py``. Vérifie aussi que les deux méthodes donnent
+les mêmes ``soon_colliding_cars``.
+"""
+
+from time import perf_counter
+
+from traffsimpy import Simulation
+from broad_phase import build_network
+
+
+def narrow_phase_time(manage, cars, pairs):
+    """Renvoie le temps d'exécution de ``manage(pairs)`` et les ``soon_colliding_cars`` obtenues."""
+    for car in cars:
+        car.soon_colliding_cars = []
+
+    start = perf_counter()
+    manage(pairs)
+    duration = perf_counter() - start
+
+    return duration, [list(car.soon_colliding_cars) for car in cars]
+
+
+def manage_pairwise(pairs):
+    for car1, car2 in pairs:
+        Simulation.manage_cars_interaction(car1, car2)
+
+
+if __name__ == "__main__":
+    print(f"{'voitures':>9} | {'couples':>8} | {'couple par couple (ms)':>22} | {'vectorisée (ms)':>15} | {'gain':>6}")
+
+    for n_cars in (50, 100, 200, 400, 800, 1600):
+        sim, cars = build_network(n_cars)
+        pairs = Simulation.grid_broad_phase(cars)
+
+        pairwise_time, pairwise_res = narrow_phase_time(manage_pairwise, cars, pairs)
+        batch_time, batch_res = narrow_phase_time(Simulation.manage_cars_interactions, cars, pairs)
+        assert pairwise_res == batch_res, "les deux méthodes ne donnent pas les mêmes interactions"
+
+        print(f"{n_cars:>9} | {len(pairs):>8} | {1000 * pairwise_time:22.2f} | {1000 * batch_time:15.2f} | "
+              f"{pairwise_time / batch_time:6.1f}")
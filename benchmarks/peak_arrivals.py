@@ -0,0 +1,66 @@
+"""Vérification et mesure du temps de génération des instants de création d'une CarFactory dont le taux d'arrivée
+s'annule après une heure de pointe : la génération doit s'arrêter à la fin de la simulation si sa durée est connue, et
+sinon ne reprendre qu'une fois par fenêtre, au lieu de générer des fenêtres vides sans fin. Vérifie aussi qu'une
+simulation avec ce profil se termine, après avoir créé des voitures pendant l'heure de pointe.
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from traffsimpy import Simulation, CarFactory, Car
+from traffsimpy.math_and_util import ArrivalSchedule
+
+
+PEAK_END = 30  # s, fin de l'heure de pointe
+PEAK_RATE = 0.5  # voitures par seconde pendant l'heure de pointe
+PEAK = {"rate": lambda t: np.where(t < PEAK_END, PEAK_RATE, 0.0), "rate_max": PEAK_RATE}
+
+
+def creation_times(horizon, t_end):
+    """Renvoie les instants de création jusqu'à ``t_end`` pour une durée de simulation ``horizon``, parcourus comme
+    par l'échéancier de la simulation, le nombre d'instants de reprise de la génération sans création, et le prochain
+    instant renvoyé par ``next_after``."""
+    schedule = ArrivalSchedule(PEAK, np.random.default_rng(0))
+    schedule.horizon = horizon
+    times, rechecks, t = [], 0, -1.0
+
+    while (t := schedule.next_after(t)) <= t_end:
+        if schedule.pop_due(t):
+            times.append(t)
+        else:
+            rechecks += 1
+
+    return np.array(times), rechecks, t
+
+
+if __name__ == "__main__":
+    print(f"{'horizon (s)':>11} | {'créations':>9} | {'reprises':>8} | {'temps (ms)':>10} | prochain instant")
+    reference = None
+    for horizon in [60, 3600, float("inf")]:
+        start = perf_counter()
+        times, rechecks, next_t = creation_times(horizon, 3600)
+        duration = perf_counter() - start
+
+        peak_times = times[times < PEAK_END]
+        if reference is None:
+            reference = peak_times
+        assert np.array_equal(peak_times, reference), "les instants de création dépendent de l'horizon"
+        assert np.array_equal(times, peak_times), "des voitures sont créées après l'heure de pointe"
+
+        print(f"{horizon:>11} | {len(times):>9} | {rechecks:>8} | {duration * 1e3:10.2f} | {next_t}")
+
+    creations = []  # instants de création des voitures de la simulation
+
+    def crea(t):
+        creations.append(t)
+        return Car()
+
+    sim = Simulation("Heure de pointe", 1440, 820, seed=0)
+    sim.create_roads([{"id": 1, "s": (0, 400), "e": (1400, 400), "car_factory": CarFactory(PEAK, crea)}])
+    sim.set_road_graph({1: None})
+
+    start = perf_counter()
+    sim.start_loop_no_display(4 * PEAK_END)
+    assert creations and max(creations) < PEAK_END, "aucune voiture créée, ou des voitures créées après l'heure de pointe"
+    print(f"simulation de {4 * PEAK_END} s terminée en {perf_counter() - start:.2f} s, {len(creations)} voitures créées")
@@ -0,0 +1,101 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from .simulation import *
+
+
+def scenarios_of_grid(grid: dict[str, Sequence] | Sequence[dict], seeds: Sequence[int]) -> list[tuple[dict, int]]:
+    """Renvoie la liste des scénarios ``(paramètres, graine)`` d'une grille de paramètres : produit cartésien des
+    valeurs si ``grid`` est un dictionnaire qui à chaque paramètre associe ses valeurs, ou liste de dictionnaires de
+    paramètres donnée directement, puis produit avec les graines."""
+    if isinstance(grid, dict):
+        names = list(grid)
+        params_list = [dict(zip(names, values)) for values in product(*grid.values())]
+    else:
+        params_list = [dict(params) for params in grid]
+
+    return [(params, seed) for params in params_list for seed in seeds]
+
+
+def run_scenario(builder: Callable, config: SimulationConfiguration, params: dict, seed: int, duration: float,
+                 size: tuple[int, int]) -> list[tuple[int, "pd.DataFrame"]]:
+    """Construit et lance sans affichage une simulation, puis renvoie les résultats de ses capteurs sous la forme d'une
+    liste de couples ``(identifiant du capteur, table des résultats)`` (voir ``Sensor.results_table``). Exécutée dans
+    les processus du pool : seuls les paramètres et les résultats passent d'un processus à l'autre, le réseau est
+    construit par chaque processus.
+
+    Args:
+        builder: fonction ``builder(sim, **params)`` qui crée les routes et le graphe de la simulation
+        config: configuration de la simulation, avec les paramètres de configuration du scénario
+        params: paramètres du scénario passés à ``builder``
+        seed: graine de la simulation, dont sont dérivés les flux aléatoires de ses composants
+        duration: durée de la simulation
+        size: taille de la simulation, en pixels
+    """
+    # graine de np.random pour les éventuelles fonctions de l'utilisateur qui l'utilisent, l'état du générateur global
+    # étant rétabli ensuite : avec processes=1, le scénario est lancé dans le processus de l'appelant
+    global_state = np.random.get_state()
+    np.random.seed(seed)
+
+    try:
+        sim = Simulation(f"{params} ({seed = })", *size, config=config, seed=seed)
+        builder(sim, **params)
+        sim.start_loop_no_display(duration)
+        sim.compute_sensors_results()
+
+        return [(sensor.id, sensor.results_table()) for road in sim.roads for sensor in road.sensors]
+    finally:
+        np.random.set_state(global_state)
+
+
+def run_batch(builder: Callable, grid: dict[str, Sequence] | Sequence[dict], duration: float,
+              seeds: Sequence[int] = (0,), processes: int | None = None,
+              config: SimulationConfiguration | None = None, size: tuple[int, int] = (1440, 820)) -> "pd.DataFrame":
+    """Lance sans affichage une simulation par scénario d'une grille de paramètres et par graine, réparties sur un pool
+    de processus, et renvoie les résultats de tous leurs capteurs dans une seule table.
+
+    Un paramètre de la grille qui est un paramètre de la configuration, c'est-à-dire une clé de ``config.def_settings``
+    (``tl_red_delay``, ``t_react``, ``a_max``...), est appliqué à la configuration du scénario, et donc aux voitures qui
+    y sont créées, les autres sont passés à ``builder``. Chaque ligne de la table renvoyée est une ligne de
+    ``Sensor.results_table``, précédée des paramètres du scénario, de sa graine et de l'identifiant du capteur.
+
+    Args:
+        builder: fonction ``builder(sim, **params)`` qui crée les routes et le graphe de la simulation ``sim``, définie au
+            niveau d'un module pour pouvoir être envoyée aux processus
+        grid: dictionnaire qui à un paramètre associe la liste de ses valeurs, pour le produit cartésien des valeurs,
+            ou liste des dictionnaires de paramètres des scénarios
+        duration: durée de chaque simulation
+        seeds: graines des simulations, chaque scénario étant lancé une fois par graine, avec des flux aléatoires
+            indépendants d'une graine à l'autre
+        processes: nombre de processus, par défaut le nombre de cœurs. Avec 1, les scénarios sont lancés dans le
+            processus courant
+        config: configuration de base, ``simulation_configuration`` par défaut
+        size: taille des simulations, en pixels
+    """
+    config = simulation_configuration if config is None else config
+    scenarios = scenarios_of_grid(grid, seeds)
+
+    # séparation des paramètres de configuration et des paramètres de builder
+    tasks = []
+    for params, seed in scenarios:
+        config_params = {name: val for name, val in params.items() if name in config.def_settings}
+        builder_params = {name: val for name, val in params.items() if name not in config_params}
+        tasks.append((builder, config.replace(**config_params), builder_params, seed, duration, size))
+
+    if processes == 1:
+        results = [run_scenario(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            # un scénario par tâche : les simulations sont longues, et ainsi réparties au mieux entre les processus
+            results = list(executor.map(run_scenario, *zip(*tasks)))
+
+    # table des résultats, chaque ligne étant marquée par les paramètres de son scénario
+    tables = []
+    for (params, seed), sensors_results in zip(scenarios, results):
+        for sensor_id, table in sensors_results:
+            table = table.copy()
+            for k, (name, val) in enumerate({**params, "seed": seed, "sensor_id": sensor_id}.items()):
+                table.insert(k, name, [val] * len(table))  # les valeurs peuvent être des listes, comme [a, b] pour freq
+            tables.append(table)
+
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
@@ -0,0 +1,239 @@
+from .components import *
+
+
+def endpoint_key(endpoint: list):
+    """Clé de tri d'une extrémité : à abscisse égale, un début passe avant une fin, pour que des intervalles qui se
+    touchent s'intersectent."""
+    return endpoint[0], endpoint[1]
+
+
+class SweepAndPrune:
+    def __init__(self):
+        """
+        Phase "broad" incrémentale de détection des collisions par balayage (*sweep and prune*). Pour chacun des deux
+        axes, les extrémités des projections des boites englobantes des voitures suivies sont gardées triées d'une
+        image à l'autre : les voitures bougeant peu entre deux images, un tri par insertion les remet en ordre en temps
+        quasi linéaire, et chaque échange entre le début d'un intervalle et la fin d'un autre met à jour l'ensemble des
+        couples de voitures dont les boites englobantes s'intersectent. Les voitures qui entrent dans la zone de trafic
+        dense ou en sortent (ou qui entrent dans le réseau ou le quittent) sont ajoutées ou retirées une à une, sans
+        reconstruire les listes.
+
+        Ainsi, pour le balayage, une itération de la simulation se déroule généralement de la manière suivante :       \n
+        - les voitures qui ont quitté la zone sont retirées
+        - les voitures qui sont entrées dans la zone sont ajoutées en fin de liste
+        - les extrémités des intervalles sont mises à jour puis triées par insertion sur chaque axe, ce qui met à jour
+          les couples de boites englobantes qui s'intersectent
+        """
+        self.endpoints = [[], []]  # extrémités des intervalles selon x et y, de la forme [coordonnée, 0 pour un début ou 1 pour une fin, voiture]
+        self.car_endpoints = {}  # voiture -> extrémités de ses intervalles, ((début x, fin x), (début y, fin y))
+        self.partners = {}  # voiture -> voitures dont la boite englobante intersecte la sienne
+
+    def __repr__(self):
+        return f"SweepAndPrune(cars={len(self.car_endpoints)})"
+
+    def add(self, car: Car):
+        """Commence à suivre une voiture. Ses extrémités sont placées en fin de liste, comme si sa boite englobante était
+        après toutes les autres, et c'est le tri suivant qui les met à leur place et trouve ses intersections."""
+        car_endpoints = tuple(([float("inf"), 0, car], [float("inf"), 1, car]) for _ in range(2))
+        for axis in range(2):
+            self.endpoints[axis] += car_endpoints[axis]
+        self.car_endpoints[car] = car_endpoints
+        self.partners[car] = set()
+
+    def rebuild(self, cars: list[Car]):
+        """Reconstruit entièrement le balayage pour les voitures ``cars``, par un tri et un parcours des extrémités. Plus
+        rapide que des ajouts une à une quand beaucoup de voitures arrivent d'un coup."""
+        self.endpoints = [[], []]
+        self.car_endpoints = {}
+        self.partners = {car: set() for car in cars}
+
+        for car in cars:
+            (min_x, min_y), (max_x, max_y) = car.aabb
+            self.car_endpoints[car] = ([min_x, 0, car], [max_x, 1, car]), ([min_y, 0, car], [max_y, 1, car])
+            for axis in range(2):
+                self.endpoints[axis] += self.car_endpoints[car][axis]
+
+        for axis in range(2):
+            self.endpoints[axis].sort(key=endpoint_key)
+
+        active_cars = {}
+        for _, is_max, car in self.endpoints[0]:
+            if is_max:
+                del active_cars[car]
+            else:
+                for other_car in active_cars:
+                    self.refresh_pair(car, other_car)
+                active_cars[car] = None
+
+    def remove_all(self, cars):
+        """Arrête de suivre des voitures."""
+        cars = dict.fromkeys(cars)
+        self.endpoints = [[endpoint for endpoint in endpoints if endpoint[2] not in cars] for endpoints in self.endpoints]
+
+        for car in cars:
+            del self.car_endpoints[car]
+            for other_car in self.partners.pop(car):
+                self.partners[other_car].discard(car)
+
+    def refresh_pair(self, car1: Car, car2: Car):
+        """Met à jour l'intersection des boites englobantes de deux voitures."""
+        (min1_x, max1_x), (min1_y, max1_y) = self.car_endpoints[car1]
+        (min2_x, max2_x), (min2_y, max2_y) = self.car_endpoints[car2]
+
+        if (min1_x[0] <= max2_x[0] and min2_x[0] <= max1_x[0]
+                and min1_y[0] <= max2_y[0] and min2_y[0] <= max1_y[0]):
+            self.partners[car1].add(car2)
+            self.partners[car2].add(car1)
+        else:
+            self.partners[car1].discard(car2)
+            self.partners[car2].discard(car1)
+
+    def sort(self, axis: int):
+        """Trie les extrémités selon un axe par insertion, en mettant à jour les couples de voitures concernées par chaque
+        échange entre un début et une fin d'intervalles."""
+        endpoints = self.endpoints[axis]
+
+        for k in range(1, len(endpoints)):
+            endpoint = endpoints[k]
+            key = endpoint[0], endpoint[1]
+            j = k
+
+            while j > 0 and (endpoints[j - 1][0], endpoints[j - 1][1]) > key:
+                other = endpoints[j - 1]
+                if other[1] != endpoint[1] and other[2] is not endpoint[2]:
+                    self.refresh_pair(endpoint[2], other[2])
+                endpoints[j] = other
+                j -= 1
+
+            endpoints[j] = endpoint
+
+    def candidate_pairs(self, cars: list[Car]) -> tuple[NDArray, NDArray]:
+        """Met à jour le balayage avec les voitures actuellement dans la zone de trafic dense et renvoie les couples
+        d'indices ``(i, j)`` dans ``cars``, avec ``i < j`` et triés, des voitures dont les boites englobantes
+        s'intersectent."""
+        current_cars = dict.fromkeys(cars)
+
+        # voitures sorties de la zone ou du réseau
+        gone_cars = [car for car in self.car_endpoints if car not in current_cars]
+        if gone_cars:
+            self.remove_all(gone_cars)
+
+        # voitures entrées dans la zone ou dans le réseau
+        new_cars = [car for car in cars if car not in self.car_endpoints]
+        if len(new_cars) > len(self.car_endpoints):
+            self.rebuild(cars)
+        else:
+            for car in new_cars:
+                self.add(car)
+
+            # mise à jour des extrémités, puis tri sur chaque axe
+            for car, ((min_x, max_x), (min_y, max_y)) in self.car_endpoints.items():
+                (min_x[0], min_y[0]), (max_x[0], max_y[0]) = car.aabb
+            for axis in range(2):
+                self.sort(axis)
+
+        # construction des couples d'indices
+        index = {car: k for k, car in enumerate(cars)}
+        pairs = [(index[car], index[other]) for car, partners in self.partners.items() for other in partners
+                 if index[car] < index[other]]
+
+        if not pairs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        i, j = npa(sorted(pairs), dtype=np.int64).T
+        return i, j
+
+
+class RoadConflicts:
+    def __init__(self, roads: list[Road], length: float, width: float, delta_d_min: float, v: float, t_react: float):
+        """
+        Ensemble des couples de routes dont les voitures peuvent interagir, calculé une fois pour toutes à partir de la
+        géométrie des routes. Le couloir d'une route est le rectangle balayé par les zones de collision de ses voitures
+        (voir ``Car.compute_geometry``) quand elles la parcourent, pour des voitures dont les attributs sont majorés par
+        les bornes données. Deux routes sont en conflit si leurs couloirs s'intersectent : la phase "broad" ne garde que
+        les couples de voitures de routes en conflit.
+
+        Args:
+            roads: routes de la simulation
+            length: longueur maximum des voitures, en pixels
+            width: largeur maximum des voitures, en pixels
+            delta_d_min: distance minimum entre deux voitures maximum, en pixels
+            v: vitesse maximum des voitures, en pixels/s
+            t_react: temps de réaction maximum des conducteurs
+        """
+        self.bounds = length, width, delta_d_min, v, t_react  # bornes des attributs des voitures
+        self.index = {road.id: k for k, road in enumerate(roads)}  # identifiant de route -> indice de la route
+
+        back_reach = length / 2 + delta_d_min / 2 + 1  # distances maximum entre le centre d'une voiture et l'arrière,
+        front_reach = length / 2 + delta_d_min + v * t_react + 1  # l'avant et les côtés de ses zones de collision, avec
+        side_reach = width / 2 + delta_d_min / 2 + 1  # une marge d'un pixel
+
+        starts, ends = npa([road.start for road in roads]), npa([road.end for road in roads])
+        vd = npa([road.vd for road in roads])
+        vn = np.stack((-vd[:, 1], vd[:, 0]), axis=1)
+        back, front = starts - vd * back_reach, ends + vd * front_reach
+        self.corridors = np.stack((back + vn * side_reach, back - vn * side_reach,
+                                   front - vn * side_reach, front + vn * side_reach), axis=1)
+
+        # on ne teste que les couples de routes dont les boites englobantes des couloirs s'intersectent, trouvés avec
+        # une grille uniforme. Ses cellules sont assez grandes pour 90 % des couloirs, et chaque couloir est découpé en
+        # tronçons qui tiennent dans une cellule : une route très longue ne peut pas agrandir toutes les cellules
+        lengths = npa([road.length for road in roads]) + back_reach + front_reach  # longueurs des couloirs
+        cell_size = np.quantile(lengths, 0.9) + 2 * side_reach
+        n_pieces = np.ceil(lengths / (cell_size - 2 * side_reach)).astype(np.int64)  # tronçons d'étendue <= cell_size
+        owners = np.repeat(np.arange(len(roads)), n_pieces)  # indice de la route de chaque tronçon
+        rank = np.arange(len(owners)) - (np.cumsum(n_pieces) - n_pieces)[owners]  # rang du tronçon dans son couloir
+        piece_length = (lengths / n_pieces)[owners, None]
+        piece_back = back[owners] + vd[owners] * piece_length * rank[:, None]
+        piece_front = piece_back + vd[owners] * piece_length
+        side = vn[owners] * side_reach
+        pieces = np.stack((piece_back + side, piece_back - side, piece_front - side, piece_front + side), axis=1)
+        i, j = grid_candidate_pairs(np.stack((pieces.min(axis=1), pieces.max(axis=1)), axis=1), cell_size)
+
+        # couples de routes distinctes dont des tronçons sont proches, chacun une seule fois, par leurs clés k * n + l
+        n = len(roads)
+        i, j = np.minimum(owners[i], owners[j]), np.maximum(owners[i], owners[j])
+        keys = np.unique((i * n + j)[i != j])
+        i, j = keys // n, keys % n
+
+        sat_axes = npa([road.sat_axes for road in roads])
+        conflicting = do_polygons_intersect_batch(self.corridors[i], self.corridors[j],
+                                                  np.concatenate((sat_axes[i], sat_axes[j]), axis=1))
+        i, j = i[conflicting], j[conflicting]
+
+        # stockage creux : routes en conflit avec chaque route, dont elle-même, et clés k * n + l des couples (k, l)
+        # en conflit, triées, pour les recherches vectorisées de self.mask
+        self.neighbours = [{k} for k in range(n)]
+        for k, l in zip(i.tolist(), j.tolist()):
+            self.neighbours[k].add(l)
+            self.neighbours[l].add(k)
+        self.keys = np.sort(np.concatenate((i * n + j, j * n + i, np.arange(n, dtype=np.int64) * (n + 1))))
+
+    def __repr__(self):
+        return f"RoadConflicts(roads={len(self.index)}, conflicts={(len(self.keys) + len(self.index)) // 2})"
+
+    def cars_with_partners(self, cars: list[Car]) -> list[Car]:
+        """Renvoie, dans le même ordre, les voitures de ``cars`` dont la route est en conflit avec celle d'au moins une
+        autre voiture de ``cars`` : les autres ne peuvent former aucun couple et sont inutiles à la phase "broad"."""
+        roads = [self.index[car.road.id] for car in cars]
+        cars_per_road = {}  # indice de route -> nombre de voitures de cars sur la route
+        for k in roads:
+            cars_per_road[k] = cars_per_road.get(k, 0) + 1
+        has_partner = {k: n > 1 or any(l != k and l in cars_per_road for l in self.neighbours[k])
+                       for k, n in cars_per_road.items()}
+        return [car for car, k in zip(cars, roads) if has_partner[k]]
+
+    def covers(self, car: Car):
+        """Renvoie si les attributs de la voiture sont majorés par les bornes utilisées pour calculer la table."""
+        length, width, delta_d_min, v, t_react = self.bounds
+        return (car.length <= length and car.width <= width and car.delta_d_min <= delta_d_min
+                and max(car.v, car.v_max) <= v and car.t_react <= t_react)
+
+    def conflicting(self, car1: Car, car2: Car):
+        """Renvoie si les routes de deux voitures sont en conflit."""
+        return self.index[car2.road.id] in self.neighbours[self.index[car1.road.id]]
+
+    def mask(self, cars: list[Car], i: NDArray, j: NDArray) -> NDArray:
+        """Renvoie pour chaque couple ``(cars[i[k]], cars[j[k]])`` si les routes des deux voitures sont en conflit."""
+        roads = npa([self.index[car.road.id] for car in cars], dtype=np.int64)
+        return np.isin(roads[i] * len(self.index) + roads[j], self.keys)
@@ -1,12 +1,19 @@
-import pandas as pd
-
 from .math_and_util import *
 
 
+pd = LazyModule("pandas")  # utilisé seulement pour les résultats des capteurs
+
+
 class Car:
-    def __init__(self, v: float = sc.car_v, a: float = sc.car_a, length: float = sc.car_length,
-                 width: float = sc.car_width, a_max: float = sc.a_max, a_min: float = sc.a_min,
-                 t_react: float = sc.t_react, color: Color = sc.car_color, obj_id: int | None = None, **kwargs):
+    # attributs de la voiture, sans __dict__ pour qu'une voiture prenne peu de mémoire (voir benchmarks/car_memory.py),
+    # les quatre derniers n'étant utilisés que par StoredCar (voir VehicleStore)
+    __slots__ = ("id", "color", "length", "width", "road", "next_road", "d", "_pos", "v", "a", "delta_d_min", "a_max",
+                 "a_min", "a_exp", "t_react", "v_max", "_geometry", "leaders", "soon_colliding_cars", "date_of_birth",
+                 "d_traveled", "sync_t", "store", "slot", "first_car_leaders", "_geometry_generation")
+
+    def __init__(self, v: float | None = None, a: float | None = None, length: float | None = None,
+                 width: float | None = None, a_max: float | None = None, a_min: float | None = None,
+                 t_react: float | None = None, color: Color | None = None, obj_id: int | None = None, **kwargs):
         """
         Objet voiture, ou plus largement tout véhicule de la simulation. Une voiture est toujours
         rattachée à une route. Sa position est déterminée par la route auquelle elle est rattachée et la distance qu'
@@ -18,20 +25,33 @@ class Car:
         - la route de la voiture lui fournit son leader
         - la voiture calcule son leader vituel équivalent puis met à jour son accélération, sa vitesse et sa distance
           depuis le début de la route
-        - la route met à jour la position (x, y) de la voiture, ce qui actualise tous les attributs qui en dépendent
-          (rectangle d'affichage, zones de collision...)
+        - la position (x, y) de la voiture, calculée à partir de sa route et de d, change, ce qui invalide tous les
+          attributs qui en dépendent (rectangle d'affichage, zones de collision...), recalculés seulement s'ils sont
+          demandés
+
+        Les paramètres laissés à None prennent la valeur de la configuration de la simulation active au moment de la
+        création de la voiture (``sc.car_v``, ``sc.car_a``, ``sc.car_length``...), et non à l'import du module.
 
         Args:
-            v: vitesse initiale, en m/s
-            a: accélération initiale, en m/s²
-            length: longueur, en m
-            width: largeur, en m
-            a_max: accélération maximale, en m/s²
-            a_min: décélération minimale, en m/s² (négative, a priori)
-            t_react: temps de réaction du conducteur, en s
-            color: couleur
+            v: vitesse initiale, en m/s, ``sc.car_v`` par défaut (None pour la vitesse maximale de la route)
+            a: accélération initiale, en m/s², ``sc.car_a`` par défaut
+            length: longueur, en m, ``sc.car_length`` par défaut
+            width: largeur, en m, ``sc.car_width`` par défaut
+            a_max: accélération maximale, en m/s², ``sc.a_max`` par défaut
+            a_min: décélération minimale, en m/s² (négative, a priori), ``sc.a_min`` par défaut
+            t_react: temps de réaction du conducteur, en s, ``sc.t_react`` par défaut
+            color: couleur, ``sc.car_color`` par défaut
             obj_id: éventuel identifiant
         """
+        v = sc.car_v if v is None else v
+        a = sc.car_a if a is None else a
+        length = sc.car_length if length is None else length
+        width = sc.car_width if width is None else width
+        a_max = sc.a_max if a_max is None else a_max
+        a_min = sc.a_min if a_min is None else a_min
+        t_react = sc.t_react if t_react is None else t_react
+        color = sc.car_color if color is None else color
+
         # attributs constants
         self.id = new_id(self, obj_id, pos=kwargs.get("pos_id", True))
         self.color = color
@@ -44,7 +64,7 @@ class Car:
 
         # coordonnées, vitesse et accélération
         self.d = 0  # distance du centre du véhicule jusqu'au début de la route
-        self._pos = npz(2)  # position du centre du véhicule
+        self._pos = None  # position du centre du véhicule si elle est fixée, sinon calculée à partir de d (voir self.pos)
         self.v = v * sc.scale if v is not None else None  # vitesse instantanée, sera remplacée par self.road.v_max si None
         self.a = a * sc.scale  # accélération instantanée
 
@@ -56,42 +76,90 @@ class Car:
         self.t_react = t_react
         self.v_max = ...  # défini par la route dans road.new_car()
 
-        # coordonnées des sommets du rectangle représentant la voiture, pour affichage
-        self.vertices = npz((4, 2))
-
-        # coordonnées des sommets du trapèze à l'avant de la voiture, pour détecter les collisions
-        self.front_bumper_hitbox = npz((4, 2))
-
-        # coordonnées des sommets du rectangle sur les côtés et l'arrière de la voiture, pour détecter les collisions
-        self.side_bumper_hurtbox = npz((4, 2))
-
-        # coordonnées des sommets inférieur gauche et supérieur droite de la boite englobante droite (AABB)
-        self.aabb = npz((2, 2))
+        # sommets d'affichage, des zones de collision et de la boite englobante, calculés seulement quand ils sont
+        # demandés puis gardés jusqu'au prochain déplacement de la voiture (voir self.geometry)
+        self._geometry = None
 
-        self.leaders = []  # leaders de la voiture : liste de couples (d, v) où d est la distance par la route à une autre voiture et v sa vitesse
-        self.soon_colliding_cars = []  # voitures en potentielle collision avec la voiture : liste de Car
+        self.leaders = ()  # leaders de la voiture : liste de couples (d, v) où d est la distance par la route à une autre voiture et v sa vitesse
+        self.soon_colliding_cars = ()  # voitures en potentielle collision avec la voiture : liste de Car, créée seulement si besoin (voir self.add_soon_colliding_car)
 
-        # historique de certains attributs et sauvegarde de données pour les capteurs
+        # sauvegarde de données pour les capteurs
         self.date_of_birth = -1  # seconde où la voiture est créée
         self.d_traveled = 0  # distance totale parcourue
-        self.attr_history = {"d(t)": {}, "v(t)": {}, "a(t)": {}}  # attributs en fonction du temps
+        self.sync_t = None  # instant jusqu'auquel le mouvement de la voiture a été calculé, pour l'actualisation à plusieurs rythmes
+
+        # seulement pour StoredCar
+        self.store = self.slot = self.first_car_leaders = self._geometry_generation = None
 
     def __repr__(self):
         return f"Car(id={self.id}, pos={self.pos}, d={self.d}, v={self.v}, a={self.a}, v_max={self.v_max}, " \
                f"virtual_leader={self.virtual_leader}, soon_colliding_cars={self.soon_colliding_cars}, " \
                f"leaders={self.leaders}, next_road={self.next_road}, color={closest_color(self.color)})"
 
+    def summary(self, t: float) -> dict:
+        """Renvoie un résumé de la voiture à l'instant ``t``, en unités SI, par exemple pour l'archiver quand elle quitte
+        le réseau (voir ``Simulation.retire_car``)."""
+        return {"car_id": self.id, "date_of_birth": self.date_of_birth, "t": t, "age": t - self.date_of_birth,
+                "d_traveled": float(self.d_traveled / sc.scale), "length": float(self.length / sc.scale),
+                "width": float(self.width / sc.scale), "color": self.color}
+
     @property
     def pos(self):
-        return self._pos
+        """Position du centre de la voiture, calculée à partir de sa route et de la distance parcourue sur celle-ci,
+        sauf si elle est fixée (comme pour les fausses voitures des feux et des panneaux stop) : elle n'est donc pas
+        gardée dans la voiture."""
+        if self._pos is not None:
+            return self._pos
+        return self.road.dist_to_pos(self.d)
 
     @pos.setter
     def pos(self, pos):
-        """car.pos.setter : quand car.pos est mis à jour, cette fonction est exécutée est met à jour les autres
-        attributs de la voiture qui en dépendent (sommets pour l'affichage, les sommets des zones de collision) par la
-        même occasion."""
+        """car.pos.setter : fixe la position de la voiture, et invalide les attributs qui en dépendent (sommets pour
+        l'affichage, sommets des zones de collision, boite englobante), qui ne seront recalculés que s'ils sont
+        demandés."""
         self._pos = pos
+        self._geometry = None
+
+    @property
+    def geometry(self):
+        """Renvoie les sommets d'affichage, les sommets des zones de collision et la boite englobante de la voiture,
+        en les calculant seulement s'ils ne l'ont pas déjà été depuis le dernier déplacement de la voiture. Le calcul
+        est fait en une fois pour toutes les voitures de la route (voir ``Road.update_cars_geometry``)."""
+        if self._geometry is None:
+            self.road.update_cars_geometry()
+            if self._geometry is None:  # si la voiture n'est pas dans la liste des voitures de la route
+                self._geometry = self.compute_geometry()
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, geometry):
+        self._geometry = geometry
+
+    @property
+    def vertices(self):
+        """Coordonnées des sommets du rectangle représentant la voiture, pour affichage."""
+        return self.geometry[0]
+
+    @property
+    def front_bumper_hitbox(self):
+        """Coordonnées des sommets du trapèze à l'avant de la voiture, pour détecter les collisions."""
+        return self.geometry[1]
 
+    @property
+    def side_bumper_hurtbox(self):
+        """Coordonnées des sommets du rectangle sur les côtés et l'arrière de la voiture, pour détecter les
+        collisions."""
+        return self.geometry[2]
+
+    @property
+    def aabb(self):
+        """Coordonnées des sommets inférieur gauche et supérieur droite de la boite englobante droite (AABB)."""
+        return self.geometry[3]
+
+    def compute_geometry(self):
+        """Calcule les sommets d'affichage, les sommets des zones de collision et la boite englobante de la voiture à
+        partir de sa position et de sa route."""
+        pos = self.pos
         vd = self.road.vd  # on récupère le vecteur directeur de la route
         vd_l = vd * self.length / 2  # on le norme pour la longueur de la voiture
         vn_w = normal_vector(
@@ -102,32 +170,34 @@ class Car:
             self.delta_d_min / 2)  # vn de la route normé pour la longueur de la zone de collision de devant
 
         # sommets d'affichage
-        c1 = self.pos + vn_w - vd_l  # derrière droit
-        c2 = self.pos - vn_w - vd_l  # derrière gauche
-        c3 = self.pos - vn_w + vd_l  # devant gauche
-        c4 = self.pos + vn_w + vd_l  # devant droit
-        self.vertices = c1, c2, c3, c4
+        c1 = pos + vn_w - vd_l  # derrière droit
+        c2 = pos - vn_w - vd_l  # derrière gauche
+        c3 = pos - vn_w + vd_l  # devant gauche
+        c4 = pos + vn_w + vd_l  # devant droit
+        vertices = c1, c2, c3, c4
 
         # sommets de la zone de collision devant
         vd_ddmp = vd * (self.delta_d_min + self.v * self.t_react)  # vecteur directeur de la route normé pour la distance de sécurité et la vitesse de la voiture
-        c1 = self.pos + vn_w + vd_l + vd_ddmp  # devant droit
-        c2 = self.pos - vn_w + vd_l + vd_ddmp  # devant gauche
-        c3 = self.pos - vn_w - vn_ddm + vd_l  # derrière gauche
-        c4 = self.pos + vn_w + vn_ddm + vd_l  # derrière droit
-        self.front_bumper_hitbox = c1, c2, c3, c4
+        c1 = pos + vn_w + vd_l + vd_ddmp  # devant droit
+        c2 = pos - vn_w + vd_l + vd_ddmp  # devant gauche
+        c3 = pos - vn_w - vn_ddm + vd_l  # derrière gauche
+        c4 = pos + vn_w + vn_ddm + vd_l  # derrière droit
+        front_bumper_hitbox = c1, c2, c3, c4
 
         # sommets de la zone de collision autour
         vd_ddm = vd * self.delta_d_min / 2  # vecteur directeur de la route normé pour la distance de sécurité
-        c1 = self.pos + vn_w + vn_ddm - vd_l - vd_ddm  # derrière droit
-        c2 = self.pos - vn_w - vn_ddm - vd_l - vd_ddm  # derrière gauche
-        c3 = self.pos - vn_w - vn_ddm + vd_l  # devant gauche
-        c4 = self.pos + vn_w + vn_ddm + vd_l  # devant droit
-        self.side_bumper_hurtbox = c1, c2, c3, c4
+        c1 = pos + vn_w + vn_ddm - vd_l - vd_ddm  # derrière droit
+        c2 = pos - vn_w - vn_ddm - vd_l - vd_ddm  # derrière gauche
+        c3 = pos - vn_w - vn_ddm + vd_l  # devant gauche
+        c4 = pos + vn_w + vn_ddm + vd_l  # devant droit
+        side_bumper_hurtbox = c1, c2, c3, c4
 
         # sommets inférieur gauche et supérieur droite de l'AABB, pour la 1re phase de recherche de collisions
         c5 = c3 + vd_ddmp
         c6 = c4 + vd_ddmp
-        self.aabb = np.min([c1, c2, c5, c6], axis=0), np.max([c1, c2, c5, c6], axis=0)
+        aabb = np.min([c1, c2, c5, c6], axis=0), np.max([c1, c2, c5, c6], axis=0)
+
+        return vertices, front_bumper_hitbox, side_bumper_hurtbox, aabb
 
     def update(self, dt):
         """
@@ -140,28 +210,34 @@ class Car:
             dt: durée du mouvement
         """
         prev_d = self.d
+        config = self.road.simulation.config  # configuration figée, lue directement dans cette boucle critique
 
-        if sc.use_idm:
-            a_iidm = iidm(self, self.virtual_leader)  # si l'IDM est utilisé, on met à jour l'accélération
-            self.a = max(a_iidm, self.a_min)  # on la minore par a_min
+        if config.use_idm:
+            a_model = car_following_model(config).acceleration(self, self.virtual_leader)  # si l'IDM est utilisé, on met à jour l'accélération
+            self.a = max(a_model, self.a_min)  # on la minore par a_min
 
-        update_taylor(self, dt)  # mise à jour de d et v par développement de Taylor (en place)
+        if self.road.simulation.adaptive:
+            update_ballistic(self, dt)  # mise à jour de d et v par un schéma balistique, pour les grands pas de temps
+        else:
+            update_taylor(self, dt)  # mise à jour de d et v par développement de Taylor (en place)
 
-        self.pos = self.road.dist_to_pos(self.d)  # mise à jour de la position et ce qui en dépend
+        self._geometry = None  # la position change avec d, ce qui en dépend est invalidé
 
         # sauvergarde des attributs
-        t = round(self.road.simulation.t, 2)
         delta_d = self.d - prev_d
         self.d_traveled += delta_d
 
-        atm_sensors = sc.dynamic_data["atm_sensors"]
+        history = self.road.simulation.car_history
+        if history.recording:
+            history.record(self)  # si des capteurs surveillent des attributs en fonction du temps
 
-        if atm_sensors.get("d(t)"):
-            self.attr_history["d(t)"][t] = scale_to_si_unit("d(t)", self.d_traveled)
-        if atm_sensors.get("v(t)"):
-            self.attr_history["v(t)"][t] = scale_to_si_unit("v(t)", self.v)
-        if atm_sensors.get("a(t)"):
-            self.attr_history["a(t)"][t] = scale_to_si_unit("a(t)", self.a)
+    def add_soon_colliding_car(self, car):
+        """Ajoute une voiture à celles en potentielle collision avec la voiture, la liste n'étant créée qu'au premier
+        ajout."""
+        if self.soon_colliding_cars:
+            self.soon_colliding_cars.append(car)
+        else:
+            self.soon_colliding_cars = [car]
 
     @property
     def virtual_leader(self):
@@ -245,10 +321,16 @@ class CarFactory:
           (typiquement, le temps)
         - si elle renvoie True, la fonction de création est exécutée et renvoie une nouvelle voiture
 
+        Pour une fréquence de type ``a``, ``[a, b]`` ou ``{"rate": ...}``, les instants de création sont générés à
+        l'avance par blocs (voir ``ArrivalSchedule``) : la simulation les programme dans son échéancier (voir
+        ``EventScheduler``) et n'appelle ``scheduled_creation`` qu'à ces instants.
+
         Args:
             freq: fréquence de création de voiture, peut être de type ``[a, b]`` pour une pause aléatoire d'une durée
-                entre a et b secondes entre la création de deux voiture, ``a`` pour une fréquence constante, une fonction
-                ``f(t: float) -> bool`` ou vide pour aucune création
+                entre a et b secondes entre la création de deux voiture, ``a`` pour une fréquence constante,
+                ``{"rate": r}`` pour des arrivées poissoniennes de r voitures par seconde, ``{"rate": [(t0, r0), ...]}``
+                pour un taux constant par morceaux, ``{"rate": f, "rate_max": m}`` pour un taux ``f(t) <= m`` (voir
+                ``ArrivalSchedule``), une fonction ``f(t: float) -> bool`` ou vide pour aucune création
             crea: manière de choisir la voiture à créer, peut être de type ``{"arg": val, ...}``, ``"rand_color"``,
                 ``"rand_length"`` et/ou ``"rand_width"``, une fonction ``f(t: float) -> Car`` ou vide pour la voiture
                 par défaut
@@ -256,11 +338,11 @@ class CarFactory:
         """
         # attributs constants
         self.id = new_id(self, obj_id)
-        self.road = ...
+        self.simulation = active_simulation.get()  # simulation dont le registre contient l'objet, celle de sa route une fois rattaché (voir Simulation.adopt)
+        self._road = ...  # définie dans road.init_car_factory()
         self.args = [freq, crea]
-
-        # éventuellement utilisé pour fréquence aléatoire, prochain instant où une voiture doit être créée
-        self.next_t = ...
+        self.random = ...  # flux aléatoire, défini avec la route (voir road.setter)
+        self.arrivals = None  # instants de création générés à l'avance, définis avec la route si is_scheduled
 
         # initialisation des fonctions
         self.freq_func = self.init_freqfunc(freq)
@@ -269,49 +351,36 @@ class CarFactory:
     def __repr__(self):
         return f"CarFactory(id={self.id}, freq_arg={self.args[0]}, crea_arg={self.args[1]})"
 
-    def init_freqfunc(self, arg):
-        """Génère une fonction de fréquence de création, en fonction de ce qu'a fourni l'utilisateur (voir doc de
-        self.__init__)."""
-        if isinstance(arg, (int, float)) or (isinstance(arg, (tuple, list)) and arg[0] == arg[1]):
-            # si de type a ou [a, a], renvoie True toutes les a secondes
-            if isinstance(arg, (list, tuple)):
-                # si de type [a, a], on récupère le a
-                a = arg[0]
-            else:
-                a = arg
+    @property
+    def road(self):
+        return self._road
 
-            def freq_func(t):
-                right_time = round(t, 2) % a == 0  # True toute les a secondes
-                # on vérifie qu'il y a de la place sur la route, sauf si sc.car_fact_force_crea est True
-                if right_time and not sc.car_fact_force_crea and self.road.cars:
-                    last_car = self.road.cars[-1]
-                    enough_space_available = last_car.d - last_car.length / 2 > sc.car_fact_rand_length_max + sc.delta_d_min
-                    return enough_space_available
-                else:
-                    return right_time
+    @road.setter
+    def road(self, road):
+        """car_factory.road.setter : quand car_factory.road est mis à jour, cette fonction est exécutée et crée le flux
+        aléatoire et l'éventuel échéancier des créations de la CarFactory, dérivés de la graine de la simulation et de
+        l'identifiant de la route."""
+        self._road = road
+        simulation = road.simulation
+        self.random = simulation.random_stream("car_factory", road.id)
 
-            return freq_func
+        if self.is_scheduled:
+            self.arrivals = ArrivalSchedule(self.args[0], simulation.random_generator("arrivals", road.id))
 
-        elif isinstance(arg, (tuple, list)):
-            # si de type [a, b], attendre aléatoirement entre a et b secondes : self.next_t est le prochain instant ou
-            # la création sera permise, et on lui rajoutera un delai aléatoire entre a et b à chaque fois qu'il sera
-            # dépassé
-            a, b = arg
-            self.next_t = np.random.uniform(a, b)
+    @property
+    def is_scheduled(self):
+        """Renvoie si les instants de création sont générés à l'avance, pour une fréquence de type ``a``, ``[a, b]`` ou
+        ``{"rate": ...}``."""
+        return isinstance(self.args[0], (int, float, tuple, list, dict))
 
+    def init_freqfunc(self, arg):
+        """Génère une fonction de fréquence de création, en fonction de ce qu'a fourni l'utilisateur (voir doc de
+        self.__init__)."""
+        if isinstance(arg, (int, float, tuple, list, dict)):
+            # si les instants de création sont générés à l'avance, renvoie True si l'un d'eux est arrivé à échéance
             def freq_func(t):
-                if t >= self.next_t:
-                    delay = np.random.uniform(a, b)
-                    self.next_t += delay
-                    # on vérifie qu'il y a de la place sur la route, sauf si sc.car_fact_force_crea est True
-                    if not sc.car_fact_force_crea and self.road.cars:
-                        last_car = self.road.cars[-1]
-                        space_available = last_car.d - last_car.length / 2 > sc.car_fact_rand_length_max + sc.delta_d_min
-                        return space_available
-                    else:
-                        return True
-                else:
-                    return False
+                # on vérifie qu'il y a de la place sur la route, sauf si sc.car_fact_force_crea est True
+                return self.arrivals.pop_due(t) and self.space_available()
 
             return freq_func
 
@@ -331,6 +400,43 @@ class CarFactory:
 
             return freq_func
 
+    def next_creation(self, t):
+        """Renvoie le prochain instant strictement après ``t`` où une voiture peut être créée, +inf si la CarFactory ne
+        crée pas de voitures ou None si cet instant n'est pas connu à l'avance (fonction de l'utilisateur)."""
+        if self.is_scheduled:
+            return self.arrivals.next_after(t)
+
+        elif self.args[0] is None:
+            return INF
+
+        else:
+            return None
+
+    @property
+    def is_polled(self):
+        """Renvoie si la fonction de fréquence de création doit être appelée à chaque pas : c'est le cas pour une
+        fonction de l'utilisateur, dont les instants de création ne sont pas connus à l'avance. Sinon, les créations sont
+        des évènements programmés par la simulation (voir ``scheduled_creation``)."""
+        return self.freq_func is not None and not self.is_scheduled
+
+    def space_available(self):
+        """Renvoie s'il y a la place pour une nouvelle voiture au début de la route, ou True si
+        ``sc.car_fact_force_crea`` est vrai."""
+        if sc.car_fact_force_crea or not self.road.cars:
+            return True
+
+        last_car = self.road.cars[-1]
+        return last_car.d - last_car.length / 2 > sc.car_fact_rand_length_max + sc.delta_d_min
+
+    def scheduled_creation(self, t):
+        """Création programmée d'une voiture à l'instant ``t``, pour une fréquence dont les instants de création sont
+        générés à l'avance. Renvoie la voiture créée, ou None s'il n'y a pas la place, et l'instant de la prochaine
+        création."""
+        due = self.arrivals.pop_due(t)  # faux si t n'est que l'instant où la génération reprend après une fenêtre vide
+        next_t = self.arrivals.next_after(t)
+        car = self.crea_func(t=t) if due and self.space_available() else None
+        return car, next_t
+
     def init_creafunc(self, arg):
         """Génère une fonction de création, en fonction de ce qu'a fourni l'utilisateur (voir doc de self.__init__)."""
         if not isinstance(arg, (str, list, dict, type(None))):
@@ -349,14 +455,14 @@ class CarFactory:
                 return Car()
 
             if "rand_color" in args:
-                attrs["color"] = [np.random.randint(sc.car_fact_rand_color_min, sc.car_fact_rand_color_max) for _ in
+                attrs["color"] = [self.random.integers(sc.car_fact_rand_color_min, sc.car_fact_rand_color_max) for _ in
                                   range(3)]
 
             if "rand_length" in args:
-                attrs["length"] = np.random.uniform(sc.car_fact_rand_length_min, sc.car_fact_rand_length_max)
+                attrs["length"] = self.random.uniform(sc.car_fact_rand_length_min, sc.car_fact_rand_length_max)
 
             if "rand_width" in args:
-                attrs["width"] = np.random.uniform(sc.car_fact_rand_width_min, sc.car_fact_rand_width_max)
+                attrs["width"] = self.random.uniform(sc.car_fact_rand_width_min, sc.car_fact_rand_width_max)
 
             for a in args:
                 if isinstance(a, dict):
@@ -404,6 +510,9 @@ class CarSorter:
         # attributs constants
         self.id = new_id(self, obj_id)
         self.method = method  # méthode de tri
+        self._road = ...  # définie dans simulation.set_road_graph()
+        self.random = ...  # générateur aléatoire, défini avec la route (voir road.setter)
+        self.choices = []  # prochaines routes tirées à l'avance, la prochaine à la fin
 
         # initialisation de la fonction de tri
         self.sorter = self.init_sorter(method)
@@ -411,6 +520,18 @@ class CarSorter:
     def __repr__(self):
         return f"CarSorter(id={self.id}, method={self.method})"
 
+    @property
+    def road(self):
+        return self._road
+
+    @road.setter
+    def road(self, road):
+        """car_sorter.road.setter : quand car_sorter.road est mis à jour, cette fonction est exécutée et crée le
+        générateur aléatoire du CarSorter, dérivé de la graine de la simulation et de l'identifiant de la route."""
+        self._road = road
+        self.random = road.simulation.random_generator("car_sorter", road.id)
+        self.choices = []
+
     def init_sorter(self, arg):
         """Génère une fonction de tri selon l'argument fourni."""
         if not arg:
@@ -418,20 +539,22 @@ class CarSorter:
             self.method = None
             return empty_function
 
-        elif isinstance(arg, int):
-            # si l'argument est un id de route, renvoie une fonction renvoyant toujours la route associée
-            return lambda *_, **__: get_by_id(arg)
+        elif isinstance(arg, int) or (isinstance(arg, dict) and sum(proba > 0 for proba in arg.values()) == 1):
+            # si l'argument est un id de route, ou qu'une seule route est possible (comme entre les SRoad d'une
+            # ArcRoad), renvoie une fonction renvoyant toujours la route associée, sans tirage
+            road_id = arg if isinstance(arg, int) else next(road_id for road_id in arg if arg[road_id] > 0)
+            road = get_by_id(road_id)
+            return lambda *_, **__: road
 
         elif isinstance(arg, dict):
             # si l'argument est un disctionnaire associant un id de route à une proba, renvoie une fonction prenant une
-            # des routes aléatoirement
-            probs, roads = [], []
-            for road in arg:
-                probs.append(arg[road])
-                roads.append(road)
+            # des routes aléatoirement, tirées par blocs avec une table des alias
+            table = AliasTable([get_by_id(road_id) for road_id in arg], list(arg.values()))
 
             def sort_func(*_, **__):
-                return get_by_id(np.random.choice(roads, p=probs))
+                if not self.choices:
+                    self.choices = table.sample(self.random.random(sc.random_block_size))[::-1]
+                return self.choices.pop()
 
             return sort_func
 
@@ -450,7 +573,8 @@ class TrafficLight:
         donnée comme leader à la première voiture de la route, ce qui imite la réaction d'un conducteur face au feu.
 
         Ainsi, pour un feu, une itération de la simulation se déroule généralement de la manière suivante :             \n
-        - la simulation met à jour l'état du feu, ce actualise la fausse voiture du feu
+        - aux instants de changement d'état, programmés dans l'échéancier de la simulation, l'état du feu change, ce qui
+          actualise la fausse voiture du feu
         - la route récupère cette voiture et la fournit à sa première voiture
 
         Args:
@@ -461,8 +585,9 @@ class TrafficLight:
         """
         # attributs constants
         self.id = new_id(self, obj_id)
+        self.simulation = active_simulation.get()  # simulation dont le registre contient l'objet, celle de sa route une fois rattaché (voir Simulation.adopt)
         self.static = static  # si le feu change d'état durant la simulation
-        self.width = sc.tl_width  # épaisseur du trait représentant le feu
+        self.width = ...  # épaisseur du trait représentant le feu, définie dans road.setter
         self._road: Road = ...  # route auquelle le feu est rattaché
         self.pos = npz(2)  # position, définie dans road.setter
         self.vertices = npz((4, 2))  # sommets pour affichage, définis dans road.setter
@@ -483,6 +608,7 @@ class TrafficLight:
         """traffic_light.road.setter : quand traffic_light.road est mis à jour, cette fonction est exécutée et met à
         jour la postion, les sommets d'affichage et les fausses voitures du feu par la même occasion."""
         self._road = road
+        self.width = sc.tl_width  # lue dans la configuration de la simulation de la route, active pendant sa création
 
         self.pos = road.dist_to_pos(road.length - self.width / 2)  # position du feu
 
@@ -515,6 +641,30 @@ class TrafficLight:
         else:
             self.state = 0
 
+    def next_change(self, t):
+        """Renvoie le prochain instant strictement après ``t`` où le feu change d'état, +inf pour un feu statique."""
+        if self.static:
+            return INF
+
+        state_init_delay = {0: sc.tl_green_delay + sc.tl_orange_delay,
+                            1: sc.tl_green_delay,
+                            2: 0}[self.state_init]
+        period = sc.tl_red_delay + sc.tl_orange_delay + sc.tl_green_delay
+
+        t2 = (t + state_init_delay) % period
+
+        for boundary in (sc.tl_green_delay, sc.tl_green_delay + sc.tl_orange_delay, period):
+            if t2 < boundary:
+                return t + boundary - t2
+
+        return t + period - t2
+
+    def change_state(self, t):
+        """Passe le feu à l'état suivant (vert, puis orange, puis rouge) à l'instant ``t`` d'un changement programmé,
+        et renvoie l'instant du changement suivant."""
+        self.state = {2: 1, 1: 0, 0: 2}[self.state]
+        return t + {2: sc.tl_green_delay, 1: sc.tl_orange_delay, 0: sc.tl_red_delay}[self.state]
+
     @property
     def dummy_car(self):
         """Renvoie une fausse voiture, qui fera ralentir la première voiture de la route selon la couleur du feu."""
@@ -537,6 +687,7 @@ class StopSign:
         """
         # attributs constants
         self.id = new_id(self, obj_id)
+        self.simulation = active_simulation.get()  # simulation dont le registre contient l'objet, celle de sa route une fois rattaché (voir Simulation.adopt)
         self.pos = npz(2)  # position dans sur la fenêtre
         self.vertices = npz((4, 2))  # sommets pour l'affichage
         self._road = ...  # route du panneau, définie dans road.init_sign
@@ -578,9 +729,9 @@ class Sensor:
         plusieurs capteurs.
 
         Ainsi, pour un capteur, une itération se déroule généralement de la manière suivante :
-        - il regarde chaque voiture de la route
-        - pour celles qu'il n'a jamais vu et qui l'ont dépassé, il enregistre certains de leurs attributs et note la
-        date
+        - sa route actualise ses voitures et trouve celles qui l'ont dépassé pendant leur mouvement, sans parcourir les
+        autres (voir ``Road.watch_crossings``)
+        - pour chacune, il enregistre certains de leurs attributs et l'instant de passage, interpolé pendant le pas
 
         Args:
             position: proportion de la route où sera placé le capteur (0
@@ -593,6 +744,7 @@ class Sensor:
         """
         # attributs constants
         self.id = new_id(self, obj_id)
+        self.simulation = active_simulation.get()  # simulation dont le registre contient l'objet, celle de sa route une fois rattaché (voir Simulation.adopt)
         self.d_ratio = position  # position en fraction de la longueur de la route
         self.d = 0  # distance entre le capteur et le début de la route, définie dans self.road.setter
         self.vertices = npz((4, 2))  # sommets d'affichage, définis dans self.road.setter
@@ -601,13 +753,20 @@ class Sensor:
         self.attributes_to_monitor = self.init_atm(attributes_to_monitor)  # attributs surveillés des voitures
 
         # stockage des données
-        self.already_seen_cars_id = {}  # id des voitures déjà vues
-        self.data = []  # données brutes, de la forme [t, car_id, attr1, ...]
+        self.data = self.init_data()  # données brutes en colonnes t, car_id, attr1..., ou seulement t et car_id pour des fonctions du temps, lues dans l'historique des voitures (voir CarHistory)
         self.df = None  # données sous forme de DataFrame, calculées dans self.compute_results()
 
     def __repr__(self):
         return f"Sensor(id={self.id}, position={self.d_ratio}, attributes_to_monitor={self.attributes_to_monitor}, road_id={self.road.id})"
 
+    def init_data(self):
+        """Renvoie la table des données brutes, avec des colonnes de nombres pour les attributs ayant une unité et
+        d'objets quelconques pour les autres."""
+        dtypes = {"t": float, "car_id": np.int64}
+        if self.inst_data:
+            dtypes |= {attr: float if attr in UNITS_OF_ATTR else object for attr in self.attributes_to_monitor}
+        return ColumnBuffer(dtypes)
+
     def init_atm(self, atm):
         if atm is None:
             return []
@@ -616,9 +775,7 @@ class Sensor:
             atm = [atm]
 
         if any(attr in ["d(t)", "v(t)", "a(t)"] for attr in atm):
-            self.inst_data = False
-            for attr in atm:
-                sc.dynamic_data["atm_sensors"][attr] = True
+            self.inst_data = False  # les attributs sont ajoutés à ceux surveillés par la simulation dans self.road.setter
         else:
             self.inst_data = True
 
@@ -632,6 +789,9 @@ class Sensor:
     def road(self, road):
         self._road = road
         self.d = road.length * self.d_ratio
+        if not self.inst_data:  # la simulation de la route enregistre l'historique des attributs surveillés
+            for attr in self.attributes_to_monitor:
+                road.simulation.dynamic_data["atm_sensors"][attr] = True
         vn_w = normal_vector(self.road.vd, self.road.width / 2)
         vd = self.road.vd
         vd_l = vd * sc.sensor_width / 2
@@ -652,85 +812,65 @@ class Sensor:
         # liste des attributs avec leurs unités
         atm_with_units = [f"{attr} ({UNITS_OF_ATTR.get(attr, '')})" for attr in self.attributes_to_monitor]
 
+        # lignes gardées : celles des how_many dernières voitures, sans les données trop vieilles
+        first = int(max(0, len(self.data) - how_many))
+        kept = first + np.flatnonzero(self.data["t"][first:] >= since)
+
         if self.inst_data:
-            # pour des données instantanées, on crée un simple DataFrame en retirant les données trop veilles
-            data = self.data.copy()  # copie des données pour traitement
+            # pour des données instantanées, on crée un simple DataFrame, les colonnes d'objets quelconques (comme les
+            # couleurs) étant converties en nombres si possible
+            columns = [self.data[name][kept] for name in self.data.columns]
+            self.df = pd.DataFrame(dict(zip(["t (s)", "car_id"] + atm_with_units, columns))).infer_objects()
 
-            if how_many < INF:
-                # on retire des données des premières voitures
-                data = data[-how_many::]
+        else:
+            # pour des fonctions du temps, on utilise un MultiIndex avec un produit des noms des fonctions et des id des
+            # voitures, les valeurs étant lues dans l'historique des voitures
+            cars_id = list(dict.fromkeys(self.data["car_id"][kept].tolist()))  # id des voitures gardées, une seule fois même si elles sont passées plusieurs fois
+            t, samples_car_id, values = self.road.simulation.car_history.samples_of(cars_id)
+            values = values[:, [HISTORY_ATTRS.index(attr) for attr in self.attributes_to_monitor]]
 
-            if since > 0:
-                # on retire les données trop vieilles
-                processed_data = []
-                for data_row in data:
-                    if data_row[0] >= since:
-                        processed_data.append(data_row)
-                data = processed_data
+            # index du DataFrame : union des dates des échantillons, arrondies pour les erreurs d'arrondi sur le temps
+            index, rows = np.unique(np.round(t, 4), return_inverse=True)
 
-            # création du DataFrame
-            self.df = pd.DataFrame(data=data, columns=["t (s)", "car_id"] + atm_with_units)
+            # colonne de la première fonction de chaque échantillon, selon la position de sa voiture dans cars_id
+            cars_order = np.argsort(cars_id)
+            cars_col = cars_order[np.searchsorted(np.asarray(cars_id)[cars_order], samples_car_id)]
 
-        else:
-            # pour des fonctions du temps, on utilise un MultiIndex avec un produit des noms des fonctions et des id des
-            # voitures
-            index = set()  # index du DataFrame, union des ensembles de définition des fonctions du temps
-            cars_id = []  # id des voitures dont les données n'ont pas été retirées pendant le traitement
-            data = self.data.copy()  # copie des données pour traitement
-
-            if how_many < INF:
-                # on retire les données des premières voitures
-                data = data[-how_many::]
-
-            for data_t, car_id, time_to_vals_dic, *_ in data:
-                # on construit l'index en gardant les dates nécessaires
-                if data_t >= since:
-                    index = index.union(set(time_to_vals_dic.keys()))
-                    cars_id.append(car_id)
-
-            index = sorted(index)  # tri des dates et conversion en liste
-            processed_data = []
-
-            for t in index:
-                # on retire les données trop vieilles en utilisant les dates de l'index
-                row = []
-                for _, car_id, *time_to_val_dics in data:
-                    if car_id in cars_id:
-                        for time_to_val_dic in time_to_val_dics:
-                            val = time_to_val_dic.get(round(t, 4))
-                            row.append(val)
-
-                processed_data.append(row)
+            processed_data = np.full((len(index), len(cars_id), len(atm_with_units)), np.nan)
+            processed_data[rows, cars_col] = values
 
             # création du MultiIndex
             multi_index = pd.MultiIndex.from_product([cars_id, atm_with_units], names=["car_id", "f(t)"])
 
             # création du DataFrame
-            self.df = pd.DataFrame(data=processed_data, columns=multi_index, index=index)
+            self.df = pd.DataFrame(data=processed_data.reshape(len(index), len(multi_index)), columns=multi_index, index=index)
 
     def watch_car(self, car, t):
         """Récupère les attributs à surveiller d'une voiture."""
-        data_row = [t, car.id]
+        data_row = []
 
-        for attr in self.attributes_to_monitor:
+        # les fonctions du temps ne sont lues qu'à la fin, dans l'historique des voitures
+        for attr in self.attributes_to_monitor if self.inst_data else []:
             if attr == "age":
                 val = t - car.date_of_birth
-            elif self.inst_data:
-                val = car.__getattribute__(attr)
             else:
-                val = car.attr_history[attr]
+                val = car.__getattribute__(attr)
 
             val = scale_to_si_unit(attr, val)
             data_row.append(val)
 
-        self.data.append(data_row)
-        self.already_seen_cars_id[car.id] = 1
+        self.data.append(t, car.id, *data_row)
+
+    def results_table(self):
+        """Renvoie les données du capteur sous forme d'une table avec une ligne par voiture et par date, de colonnes
+        ``"t (s)"``, ``"car_id"`` puis les attributs surveillés, pour les données instantanées comme pour les fonctions du
+        temps. Les données doivent être préalablement traitées avec compute_results()."""
+        if self.inst_data:
+            return self.df
 
-    def watch_road(self, t):
-        """Récupère les attributs à surveiller des voitures d'une route ayant dépassé le capteur."""
-        for car in self.road.cars:
-            if car.id not in self.already_seen_cars_id and car.d >= self.d:
-                self.watch_car(car, t)
+        df = self.df.rename_axis("t (s)").stack(level="car_id").dropna(how="all").reset_index()
+        df.columns.name = None
+        return df
 
     def results(self, form: str = "str", describe: bool = True, **kwargs):
         """Met en forme les données du capteur. Les données doivent être préalablement traitées avec compute_results()."""
@@ -779,7 +919,8 @@ class Sensor:
 
 
 class Road:
-    def __init__(self, start, end, color, v_max, with_arrows, priority, heavily_traveled, car_factory, sign, sensors, obj_id):
+    def __init__(self, start, end, color, v_max, with_arrows, priority, heavily_traveled, car_factory, sign, sensors, obj_id,
+                 simulation):
         """
         Objet route droite. Une route droite gère des voitures, un élement de signalisation et des capteurs, et est
         utilise un CarFactory qui gère la création de ses voitures et un CarSorter qui gère le tri des voitures qui
@@ -815,10 +956,12 @@ class Road:
                 signalisation ou panneau stop
             sensors: éventuels capteurs
             obj_id: éventuel identifiant
+            simulation: simulation de la route, à laquelle sont rattachés ses CarFactory, élément de signalisation et
+                capteurs, même s'ils ont été créés pendant qu'une autre simulation était active
         """
         # attributs constants
-        self.id = new_id(self, obj_id)
-        self.simulation = get_by_id(0)
+        self.id = new_id(self, obj_id, simulation=simulation)
+        self.simulation = simulation
         self.start, self.end = start, end
         self.width = sc.road_width * sc.scale
         self.color = color
@@ -832,11 +975,16 @@ class Road:
         vn = normal_vector(self.vd, self.width / 2)  # vecteur normal pour les coord des sommets
         self.vertices = self.start + vn, self.start - vn, self.end - vn, self.end + vn  # coordonnées des sommets, pour l'affichage
         self.angle = angle_of_vect(self.vd)  # angle de la route par rapport à l'axe des abscisses
+        self.sat_axes = npa((self.vd, normal_vector(self.vd)))  # normales aux côtés des zones de collision des voitures de la route, pour la phase "narrow"
 
         self.car_sorter = CarSorter()
         self.car_factory = self.init_car_factory(car_factory)
+        self.rate_class = 0  # classe de rythme d'actualisation, voir self.compute_rate_class()
+        self.index = -1  # position dans simulation.roads, définie avec les routes actives (voir Simulation.active_roads)
         self.sign = self.init_sign(sign)
         self.sensors = self.init_sensors(sensors)
+        self.sensors_by_d = sorted(self.sensors, key=lambda sensor: sensor.d)  # capteurs triés par position, pour trouver ceux que dépasse une voiture (voir self.watch_crossings)
+        self.sensors_d = [sensor.d for sensor in self.sensors_by_d]  # positions triées des capteurs
 
         # liste des voitures appartenant à la route
         self.cars: list[Car] = []
@@ -851,6 +999,7 @@ class Road:
             cf.road = self
             return cf
         else:
+            self.simulation.adopt(car_factory)
             car_factory.road = self
             return car_factory
 
@@ -859,12 +1008,14 @@ class Road:
         if sign is None:
             return TrafficLight(state_init=2, static=True)
         else:
+            self.simulation.adopt(sign)
             sign.road = self  # sign.road.setter gère tout
             return sign
 
     def init_sensors(self, sensors):
         """Initialise le/les capteur/s de la route."""
         if isinstance(sensors, Sensor):
+            self.simulation.adopt(sensors)
             sensors.road = self
             return [sensors]
 
@@ -873,6 +1024,7 @@ class Road:
 
         else:
             for sensor in sensors:
+                self.simulation.adopt(sensor)
                 sensor.road = self  # sensor.road.setter gère tout
             return sensors
 
@@ -880,67 +1032,178 @@ class Road:
         """Renvoie les coordonnées d'un objet de la route à une distance ``d`` du début de la route."""
         return self.start + self.vd * d
 
-    def update_cars(self, dt, leaders):
+    def update_cars(self, dt, leaders, until: float | None = None):
         """Bouge les voitures de la route à leurs positions après dt.
 
         Args:
             dt: durée du mouvement
             leaders: voitures leaders de la première voiture de la route
+            until: éventuel instant jusqu'auquel calculer le mouvement de chaque voiture, depuis son ``car.sync_t``,
+                pour l'actualisation à plusieurs rythmes : ``dt`` n'est alors utilisé que pour les voitures qui n'ont
+                jamais bougé
         """
-        sign_car = self.sign.dummy_car  # on récupère la fausse voiture du feu/stop de la route
-
         for i, car in enumerate(self.cars):
             if i > 0:
                 # pour toutes les voitures sauf la première, donner la voiture suivante
                 leading_car = self.cars[i - 1]
                 car.leaders = [(leading_car, (leading_car.d - leading_car.length / 2) - (car.d + car.length / 2), 1)]
 
-            elif sign_car is not None:
-                # si l'élement de signalisation est actif et que le leader le plus proche est assez loin, on utilise sa
-                # fausse voiture pour la première voiture
-                sign_car_d = sign_car.d - (car.d + car.length / 2)
-
-                if leaders:
-                    closest_road_leader_tuple = min(leaders, key=lambda leader: leader[1])
-                    closest_road_leader_d = closest_road_leader_tuple[1] + (self.length - car.d - car.length / 2) - closest_road_leader_tuple[0].length / 2
-
-                    if sign_car_d >= closest_road_leader_d:
-                        car.leaders = [(leader, closest_road_leader_d, p) for leader, d, p in
-                                       leaders]
-                    else:
-                        car.leaders = [(sign_car, sign_car_d, 1)]
-                else:
-                    car.leaders = [(sign_car, sign_car_d, 1)]
-
             else:
-                # sinon pour la première voiture, donner les leaders de la route en ajustant les distances
-                car.leaders = [(leader, d + self.length - (car.d + car.length / 2), p) for leader, d, p in leaders]
-
-            # mise à jour des vecteurs du mouvmement de la voiture
-            car.update(dt)
-            car.soon_colliding_cars = []
+                # pour la première voiture, donner les leaders de la route ou la fausse voiture de la signalisation
+                car.leaders = self.first_car_leaders(car, leaders)
+
+            # mise à jour des vecteurs du mouvmement de la voiture, sauf si elle a déjà bougé pendant ce pas sur une
+            # route précédente (voir Simulation.transferred_cars), en gardant son mouvement pour les capteurs
+            prev_d, t_start, car_dt = car.d, self.simulation.t, 0
+            if until is not None:
+                car_dt = until - car.sync_t if car.sync_t is not None else dt
+                if car_dt > 0:
+                    car.update(car_dt)
+                car.sync_t, t_start = until, until - car_dt
+            elif car not in self.simulation.transferred_cars:
+                car_dt = dt
+                car.update(dt)
+            car.soon_colliding_cars = ()
 
             # transition douce du v_max avec celui de la prochaine route
             car.v_max = self.v_max_transition(car)
 
+            if self.sensors:
+                self.watch_crossings(car, prev_d, t_start, car_dt)  # capteurs dépassés pendant le mouvement
+
             if car.d > self.length:  # si la voiture sort de la route
                 car.d -= self.length  # on initialise le prochain d
                 if car.next_road is not None:
-                    car.next_road.new_car(car)  # on l'ajoute à la prochaine route si elle existe
+                    car.next_road.new_car(car, (prev_d - self.length, t_start, car_dt))  # on l'ajoute à la prochaine route si elle existe
+                    if self.simulation.adaptive:
+                        self.simulation.transferred_cars[car] = True
+                else:
+                    self.simulation.retire_car(car)  # sinon, elle quitte le réseau
                 self.cars.remove(car)  # on retire la voiture de la liste des voitures (pas d'impact sur la boucle avec enumerate)
 
-    def update_sensors(self, t):
-        """Met à jour les capteurs de la route."""
-        for sensor in self.sensors:
-            sensor.watch_road(t)
+    def cars_geometry(self):
+        """Renvoie les sommets d'affichage, les sommets des zones de collision et les boites englobantes de toutes les
+        voitures de la route, calculés en une fois (voir ``cars_geometry``) et dans l'ordre de ``self.cars``."""
+        attrs = npa([(car.d, car.length, car.width, car.v, car.delta_d_min, car.t_react) for car in self.cars])
+        d, length, width, v, delta_d_min, t_react = attrs.T
+        pos = self.start + self.vd * d[:, None]
+        return cars_geometry(pos, self.vd, length, width, v, delta_d_min, t_react)
+
+    def update_cars_geometry(self):
+        """Met à jour la géométrie de toutes les voitures de la route, avec les tableaux de ``self.cars_geometry()``."""
+        if not self.cars:
+            return
+
+        for car, *geometry in zip(self.cars, *self.cars_geometry()):
+            car.geometry = geometry
+
+    def first_car_leaders(self, car, leaders):
+        """Renvoie les leaders de la première voiture de la route, sous la forme d'une liste de tuples
+        ``(voiture, distance, proba)``.
+
+        Args:
+            car: première voiture de la route
+            leaders: leaders de la route
+        """
+        sign_car = self.sign.dummy_car  # on récupère la fausse voiture du feu/stop de la route
+
+        if sign_car is not None:
+            # si l'élement de signalisation est actif et que le leader le plus proche est assez loin, on utilise sa
+            # fausse voiture pour la première voiture
+            sign_car_d = sign_car.d - (car.d + car.length / 2)
+
+            if leaders:
+                closest_road_leader_tuple = min(leaders, key=lambda leader: leader[1])
+                closest_road_leader_d = closest_road_leader_tuple[1] + (self.length - car.d - car.length / 2) - closest_road_leader_tuple[0].length / 2
+
+                if sign_car_d >= closest_road_leader_d:
+                    return [(leader, closest_road_leader_d, p) for leader, d, p in leaders]
+                else:
+                    return [(sign_car, sign_car_d, 1)]
+            else:
+                return [(sign_car, sign_car_d, 1)]
+
+        else:
+            # sinon, donner les leaders de la route en ajustant les distances
+            return [(leader, d + self.length - (car.d + car.length / 2), p) for leader, d, p in leaders]
+
+    def compute_rate_class(self, heavy_traffic_area: tuple[Coordinates, float], max_class: int) -> int:
+        """Renvoie la classe de rythme d'actualisation de la route, selon l'état de son trafic : une route de classe k
+        est actualisée tous les 2**k pas de la simulation. Une route est de classe 0 si elle a des capteurs, si elle est
+        dans la zone de trafic dense ou si une de ses voitures rattrape un leader en moins de 5 s, de classe au plus 1 si
+        une voiture rattrape un leader en moins de 15 s ou accélère ou freine fortement, et de classe ``max_class``
+        sinon (trafic fluide).
+
+        Args:
+            heavy_traffic_area: zone de trafic dense de la simulation
+            max_class: classe maximum
+        """
+        if self.sensors or (sc.use_hitboxes and self.is_heavily_traveled):
+            return 0
+
+        rate_class = max_class
+        for car in self.cars:
+            if sc.use_hitboxes and is_inside_circle(car.pos, heavy_traffic_area):
+                return 0
+
+            for leader, gap, _ in car.leaders:
+                closing_v = car.v - leader.v
+                if closing_v > 0:
+                    time_to_close = max(gap, 0) / closing_v
+                    if time_to_close < 5:
+                        return 0
+                    elif time_to_close < 15:
+                        rate_class = min(rate_class, 1)
+
+            if abs(car.a) > car.a_max / 5:
+                rate_class = min(rate_class, 1)
+
+        return rate_class
+
+    @property
+    def is_active(self):
+        """Renvoie si la route doit être actualisée à chaque pas : si elle a des voitures ou une CarFactory dont la
+        fonction de fréquence de création est appelée à chaque pas. Les changements d'état des feux et les autres
+        créations de voitures sont des évènements programmés (voir ``EventScheduler``)."""
+        return bool(self.cars) or self.car_factory.is_polled
+
+    def next_sensor_d(self, d: float) -> float:
+        """Renvoie la position du premier capteur de la route au-delà de ``d``, +inf s'il n'y en a pas."""
+        k = bisect_right(self.sensors_d, d)
+        return self.sensors_d[k] if k < len(self.sensors_d) else INF
+
+    def watch_crossings(self, car: Car, prev_d: float, t: float, dt: float = 0):
+        """Fait relever une voiture par les capteurs de la route qu'elle a dépassés en allant de ``prev_d`` à ``car.d``,
+        les capteurs étant triés par position : le coût ne dépend que du nombre de capteurs dépassés.
+
+        Args:
+            car: voiture
+            prev_d: distance de la voiture au début de la route avant son mouvement
+            t: instant du début du mouvement
+            dt: durée du mouvement, pendant lequel l'instant de passage devant chaque capteur est interpolé
+                linéairement, ou 0 pour relever la voiture à l'instant ``t``
+        """
+        first = bisect_right(self.sensors_d, prev_d)  # premier capteur au-delà de prev_d
+        last = bisect_right(self.sensors_d, car.d)  # premier capteur au-delà de car.d
+
+        for sensor in self.sensors_by_d[first:last]:
+            sensor.watch_car(car, t + dt * (sensor.d - prev_d) / (car.d - prev_d) if dt else t)
 
     def update_sign(self, t):
         """Met à jour la signalétique de la route (feu/stop) si besoin."""
         if isinstance(self.sign, TrafficLight):
             self.sign.update(t)
 
-    def new_car(self, car: Car):
-        """Ajoute une voiture à la route, qui conservera son ``car.d``."""
+    def new_car(self, car: Car, move: tuple[float, float, float] | None = None):
+        """Ajoute une voiture à la route, qui conservera son ``car.d``. Les capteurs de la route qu'elle a déjà dépassés
+        la relèvent, à l'instant actuel ou, si ``move`` est fourni, à l'instant de passage interpolé pendant son
+        mouvement (voir ``watch_crossings``).
+
+        Args:
+            car: voiture
+            move: éventuel mouvement pendant lequel la voiture est arrivée sur la route, de la forme ``(distance au
+                début de la route avant le mouvement, instant du début, durée)``
+        """
         if car is None:
             return
 
@@ -952,7 +1215,10 @@ class Road:
         if car.d > self.length:  # si la voiture sort (déjà !) de la route
             car.d -= self.length  # on initialise le prochain d
             if car.next_road is not None:
-                car.next_road.new_car(car)  # on l'ajoute à la prochaine route si elle existe
+                next_move = None if move is None else (move[0] - self.length, *move[1:])
+                car.next_road.new_car(car, next_move)  # on l'ajoute à la prochaine route si elle existe
+            else:
+                self.simulation.retire_car(car)  # sinon, elle quitte le réseau
             return
 
         car.road = self
@@ -961,36 +1227,53 @@ class Road:
         if car.v is None:
             car.v = self.v_max
 
-        car.pos = self.dist_to_pos(car.d)
+        self.rate_class = 0  # la route sera actualisée au prochain pas, pour prendre en compte la nouvelle voiture
+
+        road_conflicts = self.simulation.road_conflicts
+        if road_conflicts is not None and not road_conflicts.covers(car):
+            self.simulation.road_conflicts = None  # la table des conflits entre routes sera recalculée
+
+        if sc.use_vectorized_engine:
+            self.simulation.vehicle_store.place(car, self)  # l'état de la voiture est stocké par le moteur vectorisé
+
+        car._geometry = None  # la position de la voiture change avec sa route
         self.cars.append(car)
+        self.simulation.wake_road(self)  # la route est de nouveau actualisée à chaque pas
+
+        if self.sensors:
+            prev_d, t, dt = (-INF, self.simulation.t, 0) if move is None else move
+            self.watch_crossings(car, prev_d, t, dt)
 
     def v_max_transition(self, car: Car):
         """Fonction pour faire une transition douce entre deux routes qui n'ont pas la même limite de vitesse."""
-        d_min_for_transition = self.length * (1 - sc.road_transition_size)  # d minimum pour faire la tansition
+        transition_size = self.simulation.config.road_transition_size
+        d_min_for_transition = self.length * (1 - transition_size)  # d minimum pour faire la tansition
 
         if isinstance(self, SRoad) or (car.next_road is None) or (car.d <= d_min_for_transition):
             # si la route est une SRoad, que la voiture n'a pas de prochaine route ou qu'elle est trop loin
             return car.v_max
 
         else:
-            alpha = (car.d - d_min_for_transition) / (self.length * sc.road_transition_size)
+            alpha = (car.d - d_min_for_transition) / (self.length * transition_size)
             v_max1 = self.v_max
             v_max2 = car.next_road.v_max
             return alpha * v_max2 + (1 - alpha) * v_max1
 
 
 class SRoad(Road):
-    def __init__(self, start, end, color, v_max, priority, heavily_traveled, obj_id):
+    def __init__(self, start, end, color, v_max, priority, heavily_traveled, obj_id, simulation):
         """Route droite composant une ArcRoad, dérivant de Road. Elle n'a ni flèches, ni élément de signalisation, ni
         capteurs, ni CarFactory."""
-        super().__init__(start, end, color, v_max, False, priority, heavily_traveled, None, None, None, obj_id)
+        super().__init__(start, end, color, v_max, False, priority, heavily_traveled, None, None, None, obj_id,
+                         simulation)
 
     def __repr__(self):
         return "S" + super().__repr__()
 
 
 class ArcRoad:
-    def __init__(self, start, end, vdstart, vdend, v_max, with_arrows, heavily_traveled, n, color, priority, obj_id):
+    def __init__(self, start, end, vdstart, vdend, v_max, with_arrows, heavily_traveled, n, color, priority, obj_id,
+                 simulation):
         """
         Objet route courbée, composée de multiples routes droites SRoad. N'est pas une route en soit mais un objet qui
         gère la création d'un ensemble de routes, puis qui n'est plus utilisé de la simulation.
@@ -1003,8 +1286,10 @@ class ArcRoad:
             n: nombre de routes droites formant la route courbée
             color: couleur
             obj_id: éventuel identifiant
+            simulation: simulation de la route
         """
-        self.id = new_id(self, obj_id)
+        self.id = new_id(self, obj_id, simulation=simulation)
+        self.simulation = simulation
         self.start, self.end = start, end
         self.with_arrows = with_arrows
         self.v_max = v_max * sc.arcroad_deceleration_coeff
@@ -1017,14 +1302,14 @@ class ArcRoad:
 
         self.car_factory = CarFactory()
         self.sign, self.update_sign = None, empty_function
-        self.sensors, self.update_sensors = [], empty_function
+        self.sensors = []
 
     def init_sroads(self, v_max, n, color, priority, heavily_traveled):
         sroads = []
         for i in range(n):
             rstart = self.points[i]
             rend = self.points[i + 1]
-            sroad = SRoad(rstart, rend, color, v_max, priority, heavily_traveled, None)
+            sroad = SRoad(rstart, rend, color, v_max, priority, heavily_traveled, None, self.simulation)
             sroads.append(sroad)
 
         return sroads
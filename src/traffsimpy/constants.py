@@ -3,9 +3,23 @@ from importlib.resources import files
 
 INF = float("+inf")
 
+RANDOM_STREAM_KINDS = ("car_factory", "car_sorter", "arrivals")  # composants ayant leur propre flux aléatoire, voir Simulation.random_stream
+
 DEF_FONT_PATH = files("traffsimpy").joinpath("resources/jbmono.ttf")
 DEF_ARROW_PATH = files("traffsimpy").joinpath("resources/chevron.svg")
 
+GREETINGS = """
+Bienvenue sur TraffSimPy !
+
+ESPACE : mettre en pause
+FLÈCHE DROITE/HAUT : accélérer
+FLÈCHE GAUCHE/BAS : ralentir
+DRAG : bouger
+ENTRER : recentrer
+S : faire une capture de la fenêtre
+ESC : terminer la simulation
+"""
+
 TXT_RED = Fore.RED
 TXT_BOLD = Style.BRIGHT
 TXT_RESET = Style.RESET_ALL
@@ -36,6 +50,7 @@ RED_SS = (198, 40, 40)
 PURPLE_SENSOR = (124, 77, 255)
 UNITS_OF_ATTR = {"t": "s", "date_of_birth": "s", "age": "s", "v": "m/s", "a": "m/s²", "length": "m", "width": "m",
                  "total_d": "m", "d(t)": "m", "v(t)": "m/s", "a(t)": "m/s²"}
+HISTORY_ATTRS = ("d(t)", "v(t)", "a(t)")  # attributs en fonction du temps, dans l'ordre des colonnes de l'historique des voitures (voir CarHistory)
 
 ROGB_GRADIENT = [(183, 28, 28), (186, 35, 28), (190, 43, 29), (193, 50, 29), (197, 57, 30), (200, 65, 30),
                  (204, 72, 31), (207, 80, 31), (211, 87, 32), (214, 94, 32), (218, 102, 33), (221, 109, 33),
@@ -1,9 +1,12 @@
-import pygame
-from pygame import gfxdraw as gfx
+from __future__ import annotations  # les annotations pygame ne sont pas évaluées, pour ne pas importer pygame
 
 from .math_and_util import *
 
 
+pygame = LazyModule("pygame")  # importés seulement à la création de l'affichage
+gfx = LazyModule("pygame.gfxdraw")
+
+
 def draw_polygon(surface: pygame.Surface, color: Color, points: tuple[Coordinates, ...], off_set: Coordinates = npz(2),
                  anti_aliasing: bool = True):
     """Dessine un polygone rempli.
@@ -0,0 +1,735 @@
+from heapq import heappush, heappop
+from collections import deque
+
+from .components import *
+
+
+def _column(name: str):
+    """Renvoie une propriété qui lit et écrit l'attribut ``name`` d'une voiture dans la colonne correspondante du
+    ``VehicleStore`` auquel elle appartient."""
+    def getter(car):
+        return getattr(car.store, name)[car.slot]
+
+    def setter(car, val):
+        getattr(car.store, name)[car.slot] = val
+
+    return property(getter, setter)
+
+
+class StoredCar(Car):
+    """Voiture dont l'état est stocké dans les colonnes d'un ``VehicleStore``, utilisée par le moteur vectorisé. Une
+    voiture ``Car`` devient une ``StoredCar`` quand elle rejoint le stockage et redevient une ``Car`` quand elle le
+    quitte : ses attributs du mouvement ne sont alors plus que des vues sur les tableaux du stockage."""
+    __slots__ = ()  # mêmes emplacements que Car, pour pouvoir changer la classe d'une voiture
+    d = _column("d")
+    v = _column("v")
+    a = _column("a")
+    length = _column("length")
+    a_max = _column("a_max")
+    a_min = _column("a_min")
+    t_react = _column("t_react")
+    v_max = _column("v_max")
+    delta_d_min = _column("delta_d_min")
+    a_exp = _column("a_exp")
+    d_traveled = _column("d_traveled")
+
+    @property
+    def pos(self):
+        return self.store.pos[self.slot]
+
+    @pos.setter
+    def pos(self, pos):
+        self.store.pos[self.slot] = pos
+        self._geometry = None
+
+    @property
+    def geometry(self):
+        """Comme ``Car.geometry``, mais les positions étant mises à jour par le stockage sans passer par
+        ``car.pos.setter``, la géométrie calculée n'est valable que pour la génération courante du stockage."""
+        if self._geometry is None or self._geometry_generation != self.store.generation:
+            self.road.update_cars_geometry()
+            if self._geometry is None or self._geometry_generation != self.store.generation:
+                self.geometry = self.compute_geometry()
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, geometry):
+        self._geometry = geometry
+        self._geometry_generation = self.store.generation
+
+    @property
+    def leaders(self):
+        """Leaders de la voiture : seuls ceux de la première voiture de la route sont stockés, les autres voitures ont
+        pour leader la voiture qui les précède."""
+        i = self.road.cars.index(self)
+        if i == 0:
+            return self.first_car_leaders
+
+        leading_car = self.road.cars[i - 1]
+        return [(leading_car, (leading_car.d - leading_car.length / 2) - (self.d + self.length / 2), 1)]
+
+    @leaders.setter
+    def leaders(self, leaders):
+        self.first_car_leaders = leaders
+
+
+class VehicleStore:
+    # attributs des voitures stockés en colonnes, dont ceux propres aux voitures
+    CAR_FIELDS = ("d", "v", "a", "length", "a_max", "a_min", "t_react", "v_max", "delta_d_min", "a_exp", "d_traveled")
+    FLOAT_FIELDS = CAR_FIELDS + ("road_length", "road_v_max", "next_v_max", "next_sensor_d")
+
+    def __init__(self, capacity: int = 64):
+        """
+        Stockage en colonnes (structure de tableaux) de l'état des voitures de la simulation, utilisé par le moteur
+        vectorisé (``simulation_configuration.use_vectorized_engine``). Chaque voiture occupe un emplacement (slot)
+        dans des tableaux NumPy contigus tant qu'elle est dans le réseau, et les voitures ne sont plus que des vues sur
+        ces tableaux. Toutes les voitures sont ainsi actualisées ensemble en quelques opérations vectorisées par image,
+        au lieu d'un appel à ``Car.update`` par voiture.
+
+        Les voitures d'une même route sont retrouvées en triant les emplacements selon l'identifiant de leur route puis
+        leur ordre d'arrivée sur la route, ce qui reproduit l'ordre de ``road.cars``.
+
+        Args:
+            capacity: nombre initial d'emplacements, doublé dès que nécessaire
+        """
+        self.capacity = capacity
+        self.size = 0  # nombre d'emplacements déjà utilisés au moins une fois
+        self.free_slots = []  # emplacements libérés, réutilisables
+        self.cars: list[Car | None] = [None] * capacity  # voiture associée à chaque emplacement
+        self.entry_count = 0  # compteur des arrivées sur une route, pour l'ordre des voitures
+        self.generation = 0  # nombre de mises à jour, pour invalider la géométrie des voitures
+
+        for field in self.FLOAT_FIELDS:
+            setattr(self, field, npz(capacity))
+        self.pos = npz((capacity, 2))  # position du centre des voitures
+        self.start = npz((capacity, 2))  # début de la route des voitures
+        self.vd = npz((capacity, 2))  # vecteur directeur de la route des voitures
+        self.car_id = np.zeros(capacity, dtype=np.int64)  # identifiant des voitures
+        self.road_id = np.zeros(capacity, dtype=np.int64)  # identifiant de la route des voitures
+        self.entry_seq = np.zeros(capacity, dtype=np.int64)  # numéro d'arrivée des voitures sur leur route
+        self.smooth_v_max = np.zeros(capacity, dtype=bool)  # si la limite de vitesse varie vers celle de la prochaine route
+        self.active = np.zeros(capacity, dtype=bool)  # si l'emplacement est occupé
+
+    def __repr__(self):
+        return f"VehicleStore(capacity={self.capacity}, cars={int(self.active[:self.size].sum())})"
+
+    def __len__(self):
+        return self.size - len(self.free_slots)
+
+    def grow(self):
+        """Double la capacité du stockage."""
+        old_capacity = self.capacity
+        self.capacity *= 2
+
+        for field in self.FLOAT_FIELDS + ("pos", "start", "vd", "car_id", "road_id", "entry_seq", "smooth_v_max", "active"):
+            old_array = getattr(self, field)
+            new_array = np.zeros((self.capacity,) + old_array.shape[1:], dtype=old_array.dtype)
+            new_array[:old_capacity] = old_array
+            setattr(self, field, new_array)
+
+        self.cars += [None] * (self.capacity - old_capacity)
+
+    def add(self, car: Car):
+        """Fait entrer une voiture dans le stockage : ses attributs sont copiés dans les colonnes et elle devient une
+        ``StoredCar``."""
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.size == self.capacity:
+                self.grow()
+            slot = self.size
+            self.size += 1
+
+        for field in self.CAR_FIELDS:
+            getattr(self, field)[slot] = getattr(car, field)
+        self.pos[slot] = car.pos
+        self.car_id[slot] = car.id
+
+        car.store, car.slot = self, slot
+        car._geometry = None
+        car.first_car_leaders, car.leaders = car.leaders, None
+        car.__class__ = StoredCar
+        self.cars[slot] = car
+        self.active[slot] = True
+
+    def remove(self, car: StoredCar):
+        """Fait sortir une voiture du stockage : ses attributs sont recopiés dans la voiture, qui redevient une
+        ``Car``."""
+        slot = car.slot
+        leaders = car.first_car_leaders
+        car.__class__ = Car
+
+        for field in self.CAR_FIELDS:
+            setattr(car, field, getattr(self, field)[slot].item())
+        car._geometry = None  # la position est de nouveau calculée à partir de d
+        car.leaders = leaders
+        car.store = car.slot = car.first_car_leaders = car._geometry_generation = None
+
+        self.cars[slot] = None
+        self.active[slot] = False
+        self.free_slots.append(slot)
+
+    def place(self, car: Car, road):
+        """Enregistre l'arrivée d'une voiture sur une route, en l'ajoutant au stockage si besoin."""
+        if not isinstance(car, StoredCar):
+            self.add(car)
+
+        slot = car.slot
+        self.pos[slot] = road.dist_to_pos(car.d)
+        self.road_id[slot] = road.id
+        self.entry_seq[slot] = self.entry_count
+        self.entry_count += 1
+        self.start[slot] = road.start
+        self.vd[slot] = road.vd
+        self.road_length[slot] = road.length
+        self.road_v_max[slot] = road.v_max
+        self.smooth_v_max[slot] = not isinstance(road, SRoad) and car.next_road is not None
+        self.next_v_max[slot] = car.next_road.v_max if car.next_road is not None else road.v_max
+        self.next_sensor_d[slot] = road.next_sensor_d(car.d)
+
+    def set_virtual_leaders(self, cars, delta_d, lead_v, has_leader):
+        """Calcule un à un les leaders virtuels des voitures fournies et les écrit dans les tableaux donnés, indexés
+        par emplacement."""
+        for car in cars:
+            virtual_leader = car.virtual_leader
+            if virtual_leader is None:
+                has_leader[car.slot] = False
+            else:
+                delta_d[car.slot], lead_v[car.slot] = virtual_leader
+                has_leader[car.slot] = True
+
+    def update(self, roads, roads_leaders: dict, interacting_cars, dt: float, t: float, ballistic: bool = False):
+        """Actualise toutes les voitures du stockage en une fois :
+        - calcule pour chaque voiture la distance à et la vitesse de son leader, en trouvant la voiture précédente de
+          sa route, sauf pour les premières voitures des routes et les voitures en prévision de collision, dont le
+          leader virtuel est calculé une à une
+        - en déduit les accélérations avec le modèle de poursuite, puis les vitesses et distances par développements de
+          Taylor ou par un schéma balistique
+        - fait relever par les capteurs les voitures qui les ont dépassés, trouvées en comparant les distances à la
+          position du prochain capteur de chaque voiture
+        - fait varier les limites de vitesse et fait changer de route les voitures qui sortent de la leur
+
+        Args:
+            roads: routes de la simulation
+            roads_leaders: dictionnaire qui à l'identifiant d'une route associe ses leaders
+            interacting_cars: voitures en potentielle interaction, dont la liste ``soon_colliding_cars`` peut ne pas
+                être vide
+            dt: durée du mouvement
+            t: instant du début du mouvement
+            ballistic: si les vitesses et distances sont calculées par un schéma balistique (voir ``update_ballistic``)
+                plutôt que par développements de Taylor
+        """
+        slots = np.flatnonzero(self.active[:self.size])
+        if not slots.size:
+            return
+
+        d, v, a = self.d, self.v, self.a
+        length = self.length
+
+        # ordre des voitures : par route, puis par ordre d'arrivée sur la route, comme road.cars
+        order = slots[np.lexsort((self.entry_seq[slots], self.road_id[slots]))]
+        same_road = self.road_id[order[1:]] == self.road_id[order[:-1]]
+        followers, leading = order[1:][same_road], order[:-1][same_road]
+
+        # leaders des voitures, indexés par emplacement
+        delta_d = np.full(self.size, INF)
+        lead_v = npz(self.size)
+        has_leader = np.zeros(self.size, dtype=bool)
+        delta_d[followers] = (d[leading] - length[leading] / 2) - (d[followers] + length[followers] / 2)
+        lead_v[followers] = v[leading]
+        has_leader[followers] = True
+
+        # premières voitures des routes : leaders de la route ou fausse voiture de la signalisation
+        first_cars = []
+        for road in roads:
+            if road.cars:
+                first_car = road.cars[0]
+                first_car.leaders = road.first_car_leaders(first_car, roads_leaders.get(road.id, []))
+                first_cars.append(first_car)
+
+        self.set_virtual_leaders(first_cars, delta_d, lead_v, has_leader)
+
+        # voitures en prévision de collision, dont le leader virtuel ne dépend que de soon_colliding_cars
+        colliding_cars = [car for car in interacting_cars if car.soon_colliding_cars and isinstance(car, StoredCar)]
+        self.set_virtual_leaders(colliding_cars, delta_d, lead_v, has_leader)
+
+        # accélérations
+        if sc.use_idm:
+            model = car_following_model()
+            params = {param: getattr(self, param)[slots] for param in model.PARAMS}
+            a_model = model.accelerations(delta_d[slots], v[slots], lead_v[slots], has_leader[slots], params)
+            a[slots] = np.maximum(a_model, self.a_min[slots])
+
+        # vitesses et distances, en évitant v < 0 (voir update_taylor et update_ballistic)
+        prev_d = d[slots]
+        prev_v = v[slots]
+        cur_a = a[slots]
+        next_v = prev_v + cur_a * dt
+        stopping = next_v < 0
+
+        next_d = prev_d + (prev_v if ballistic else next_v) * dt + 1 / 2 * cur_a * dt * dt
+        next_d[stopping] = prev_d[stopping] - 1 / 2 * prev_v[stopping] * prev_v[stopping] / cur_a[stopping]
+        next_v[stopping] = 0
+
+        d[slots] = next_d
+        v[slots] = next_v
+        self.d_traveled[slots] += next_d - prev_d
+        self.pos[slots] = self.start[slots] + self.vd[slots] * next_d[:, None]
+
+        # transition douce du v_max avec celui de la prochaine route (voir Road.v_max_transition)
+        d_min_for_transition = self.road_length[slots] * (1 - sc.road_transition_size)
+        transitioning = self.smooth_v_max[slots] & (next_d > d_min_for_transition)
+        if transitioning.any():
+            tr_slots = slots[transitioning]
+            alpha = (d[tr_slots] - d_min_for_transition[transitioning]) / (self.road_length[tr_slots] * sc.road_transition_size)
+            self.v_max[tr_slots] = alpha * self.next_v_max[tr_slots] + (1 - alpha) * self.road_v_max[tr_slots]
+
+        self.generation += 1  # les positions ont changé : la géométrie des voitures est invalidée
+
+        # sauvegarde des attributs en une fois, seulement si des capteurs en ont besoin
+        history = get_by_id(0).car_history
+        if history.recording:
+            history.record_many(self.car_id[slots], self.d_traveled[slots], v[slots], a[slots])
+
+        for car in interacting_cars:
+            car.soon_colliding_cars = ()
+
+        # voitures ayant dépassé le prochain capteur de leur route, seules à être relevées une à une
+        for k in np.flatnonzero(next_d >= self.next_sensor_d[slots]):
+            car = self.cars[slots[k]]
+            car.road.watch_crossings(car, prev_d[k], t, dt)
+            self.next_sensor_d[slots[k]] = car.road.next_sensor_d(next_d[k])
+
+        # voitures sortant de leur route, traitées dans l'ordre des routes pour conserver l'ordre des voitures
+        exiting = order[d[order] > self.road_length[order]]
+        if exiting.size:
+            prev_d_of_slot = npz(self.size)
+            prev_d_of_slot[slots] = prev_d
+
+        for slot in exiting:
+            car = self.cars[slot]
+            entry_seq = self.entry_seq[slot]
+            car.d -= car.road.length  # on initialise le prochain d
+            car.road.cars.remove(car)
+
+            if car.next_road is not None:
+                move = (prev_d_of_slot[slot] - car.road.length, t, dt)  # mouvement dans le repère de la prochaine route, pour ses capteurs
+                car.next_road.new_car(car, move)  # on l'ajoute à la prochaine route si elle existe
+            else:
+                car.road.simulation.retire_car(car)  # sinon, elle quitte le réseau
+
+            if self.entry_seq[slot] == entry_seq:
+                # si aucune route ne l'a acceptée, la voiture quitte le réseau et donc le stockage
+                self.remove(car)
+
+
+class CarHistory:
+    def __init__(self, scale: float, capacity: int = 4096, decimation: int = 1, retention: float = INF):
+        """
+        Historique des attributs en fonction du temps des voitures (``d(t)``, ``v(t)`` et ``a(t)``, voir
+        ``HISTORY_ATTRS``), utilisé par les capteurs qui les surveillent. Les échantillons sont écrits dans un tampon
+        circulaire préalloué dont chaque ligne est ``(identifiant, distance parcourue, vitesse, accélération)`` d'une
+        voiture, en unités de la simulation : enregistrer une voiture ne coûte qu'une écriture de ligne, et les
+        colonnes sont lues en une fois par les capteurs (voir ``samples_of``).
+
+        Les échantillons sont regroupés par pas : un pas enregistré ajoute à ``ticks`` son numéro, son instant et le
+        numéro de sa première ligne, les lignes de ses voitures se suivant. Les échantillons sont ainsi retrouvés par
+        numéro de pas, sans dictionnaire de dates arrondies.
+
+        Ainsi, pour l'historique, une itération de la simulation se déroule généralement de la manière suivante :     \n
+        - la simulation commence le pas (voir ``start_tick``), enregistré seulement tous les ``decimation`` pas et si
+          des capteurs surveillent des attributs en fonction du temps
+        - chaque voiture actualisée pendant un pas enregistré écrit sa ligne, ou le moteur vectorisé écrit celles de
+          toutes ses voitures à la fois
+        - si le tampon est plein, les pas datant de plus de ``retention`` secondes sont écrasés, et sinon sa capacité
+          est doublée
+
+        Args:
+            scale: échelle de la simulation à laquelle appartient l'historique, en pixels/m, pour convertir les
+                échantillons en unités SI quelle que soit la simulation active quand ils sont lus
+            capacity: nombre initial de lignes du tampon
+            decimation: nombre de pas entre deux pas enregistrés
+            retention: durée pendant laquelle les échantillons sont gardés, en s
+        """
+        self.scale = scale
+        self.capacity = capacity
+        self.decimation = decimation
+        self.retention = retention
+        self.samples = npz((capacity, 1 + len(HISTORY_ATTRS)))  # tampon circulaire, la ligne numéro n étant à l'indice n % capacity
+        self.head = 0  # numéro de la plus vieille ligne gardée
+        self.tail = 0  # numéro de la prochaine ligne à écrire
+        self.ticks = deque()  # pas enregistrés et gardés, de la forme (numéro du pas, instant, numéro de sa première ligne)
+        self.recording = False  # si les voitures actualisées pendant le pas en cours sont enregistrées
+        self.t = 0  # instant du pas en cours
+
+    def __repr__(self):
+        return f"CarHistory(capacity={self.capacity}, samples={len(self)}, ticks={len(self.ticks)})"
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def start_tick(self, tick: int, t: float, active: bool):
+        """Commence le pas numéro ``tick``, à l'instant ``t``, enregistré si ``active`` et si ``tick`` est un multiple de
+        ``decimation``."""
+        self.recording = active and tick % self.decimation == 0
+        if not self.recording:
+            return
+
+        if self.ticks and self.ticks[-1][2] == self.tail:
+            self.ticks.pop()  # le pas enregistré précédent n'a aucune ligne
+        self.ticks.append((tick, t, self.tail))
+        self.t = t
+
+    def record(self, car: Car):
+        """Enregistre une voiture au pas en cours."""
+        if self.tail - self.head == self.capacity:
+            self.make_room(1)
+
+        self.samples[self.tail % self.capacity] = car.id, car.d_traveled, car.v, car.a
+        self.tail += 1
+
+    def record_many(self, cars_id: NDArray, d_traveled: NDArray, v: NDArray, a: NDArray):
+        """Enregistre plusieurs voitures au pas en cours, à partir des colonnes de leurs attributs."""
+        n = len(cars_id)
+        if self.tail - self.head + n > self.capacity:
+            self.make_room(n)
+
+        rows = np.arange(self.tail, self.tail + n) % self.capacity
+        self.samples[rows] = np.column_stack((cars_id, d_traveled, v, a))
+        self.tail += n
+
+    def make_room(self, n: int):
+        """Libère au moins ``n`` lignes dans le tampon, en oubliant les pas trop vieux puis, si ce n'est pas assez, en
+        doublant sa capacité."""
+        while len(self.ticks) > 1 and self.ticks[0][1] < self.t - self.retention and len(self) + n > self.capacity:
+            self.ticks.popleft()
+            self.head = self.ticks[0][2]
+
+        if len(self) + n <= self.capacity:
+            return
+
+        capacity = self.capacity
+        while len(self) + n > capacity:
+            capacity *= 2
+
+        rows = np.arange(self.head, self.tail)
+        samples = npz((capacity, self.samples.shape[1]))
+        samples[rows % capacity] = self.samples[rows % self.capacity]
+        self.samples, self.capacity = samples, capacity
+
+    def samples_of(self, cars_id: Sequence[int]) -> tuple[NDArray, NDArray, NDArray]:
+        """Renvoie les échantillons gardés des voitures d'identifiants ``cars_id``, dans l'ordre chronologique : leurs
+        instants, les identifiants des voitures et le tableau des valeurs des attributs ``HISTORY_ATTRS``, en unités
+        SI."""
+        rows = np.arange(self.head, self.tail)
+        samples = self.samples[rows % self.capacity]
+        kept = np.isin(samples[:, 0], np.asarray(cars_id, dtype=float))
+
+        # instant de chaque ligne, celui du dernier pas commencé avant elle
+        ticks_t = np.array([t for _, t, _ in self.ticks])
+        ticks_first_row = np.array([row for *_, row in self.ticks], dtype=np.int64)
+        t = ticks_t[np.searchsorted(ticks_first_row, rows[kept], side="right") - 1]
+
+        return t, samples[kept, 0].astype(np.int64), samples[kept, 1:] / self.scale  # attributs tous en mètres
+
+
+class DownstreamIndex:
+    def __init__(self, roads: list[Road], road_graph: dict, horizon: float = INF):
+        """
+        Index des routes en aval de chaque route, pour la recherche des leaders de la première voiture d'une route (voir
+        ``Simulation.get_road_leaders``). Les routes sont regroupées en chaînes : une chaîne est une suite maximale de
+        routes où chacune a pour seule prochaine route la suivante, avec probabilité 1, et est la seule à y mener,
+        comme les routes droites d'une ArcRoad. Pour chaque chaîne, l'index garde ses routes, leurs longueurs et les
+        prochaines routes de la dernière, de sorte que la recherche n'ait qu'à parcourir des tableaux dans une chaîne et
+        ne se ramifie qu'entre les chaînes.
+
+        Args:
+            roads: routes de la simulation
+            road_graph: graphe des routes traité, de la forme ``{id: {id: proba, ...} | None, ...}``
+            horizon: distance maximum jusqu'au début d'une route pour qu'elle soit parcourue, en pixels
+        """
+        self.horizon = horizon
+        self.chains = []  # chaînes de la forme (routes, longueurs des routes, prochaines routes de la dernière route)
+        self.position = {}  # identifiant de route -> (indice de sa chaîne, position dans la chaîne)
+
+        # nombre de routes menant à chaque route
+        in_degree = {}
+        for road in roads:
+            for next_road_id in road_graph.get(road.id) or {}:
+                in_degree[next_road_id] = in_degree.get(next_road_id, 0) + 1
+
+        def linked_next_road(road_id):
+            """Renvoie l'identifiant de la route qui suit ``road_id`` dans sa chaîne, ou None si la chaîne s'arrête."""
+            next_roads = road_graph.get(road_id)
+            if next_roads is None or len(next_roads) != 1:
+                return None
+
+            next_road_id, proba = next(iter(next_roads.items()))
+            if proba != 1 or in_degree.get(next_road_id) != 1:
+                return None
+
+            return next_road_id
+
+        linked_road_ids = {linked_next_road(road.id) for road in roads} - {None}
+
+        # on commence les chaînes par les routes qui ne suivent aucune autre route dans une chaîne, puis par les routes
+        # restantes, qui forment des boucles
+        heads = [road for road in roads if road.id not in linked_road_ids]
+        for road in heads + roads:
+            if road.id not in self.position:
+                self.add_chain(road, linked_next_road, road_graph)
+
+    def __repr__(self):
+        return f"DownstreamIndex(roads={len(self.position)}, chains={len(self.chains)}, horizon={self.horizon})"
+
+    def add_chain(self, road: Road, linked_next_road, road_graph: dict):
+        """Ajoute la chaîne qui commence par ``road``."""
+        chain_roads = []
+        while road is not None and road.id not in self.position:
+            self.position[road.id] = len(self.chains), len(chain_roads)
+            chain_roads.append(road)
+            next_road_id = linked_next_road(road.id)
+            road = get_by_id(next_road_id) if next_road_id is not None else None
+
+        next_roads = road_graph.get(chain_roads[-1].id)
+        if road is not None:  # la chaîne est une boucle
+            next_roads = {road.id: 1}
+
+        lengths = [chain_road.length for chain_road in chain_roads]
+        self.chains.append((chain_roads, lengths, next_roads))
+
+    @staticmethod
+    def next_stop(chain_roads: list[Road], i: int):
+        """Renvoie la position de la première route de la chaîne à partir de ``i`` qui a au moins une voiture ou un
+        élément de signalisation actif, ou la longueur de la chaîne s'il n'y en a pas."""
+        for j in range(i, len(chain_roads)):
+            chain_road = chain_roads[j]
+            if chain_road.cars or chain_road.sign.dummy_car is not None:
+                return j
+        return len(chain_roads)
+
+    def leaders(self, starts: list[tuple[Road, float]], memo: dict = None):
+        """Renvoie les leaders trouvés en parcourant le réseau depuis les routes de ``starts``, dans une liste de tuples
+        ``(voiture, distance, proba)``. Le parcours, en profondeur, est le même que celui de
+        ``Simulation.get_road_leaders`` : il s'arrête sur une route qui possède au moins une voiture ou un élément de
+        signalisation actif, et ne passe pas deux fois par la même route.
+
+        Args:
+            starts: routes de départ du parcours et probabilités d'y arriver
+            memo: éventuel dictionnaire partagé entre des parcours faits sans que les routes ne changent, qui garde la
+                position du prochain arrêt dans chaque chaîne
+        """
+        leaders = []
+        entries = {}  # indice de chaîne -> position par laquelle le parcours y est entré
+
+        def searcher(road_id, d_traveled: float, p: float):
+            """Parcours depuis la route d'identifiant ``road_id``."""
+            c, i = self.position[road_id]
+            chain_roads, lengths, next_roads = self.chains[c]
+            end = len(chain_roads)  # position où le parcours s'arrête dans la chaîne
+
+            if c in entries:
+                if i >= entries[c]:  # si on est déjà passé sur la route, on fait rien
+                    return
+                end = entries[c]  # sinon, on s'arrêtera là où le parcours est déjà passé
+            entries[c] = i
+
+            if memo is None:
+                j = self.next_stop(chain_roads, i)
+            else:
+                j = memo.get((c, i))
+                if j is None:
+                    j = memo[(c, i)] = self.next_stop(chain_roads, i)
+
+            if j < end:
+                # une route de la chaîne a une voiture ou un élément de signalisation actif
+                d_traveled = sum(lengths[i:j], d_traveled)
+                if d_traveled > self.horizon:
+                    return
+
+                stop_road = chain_roads[j]
+                if stop_road.cars:
+                    # si la route possède au moins une voiture, on prend la dernière
+                    last_car = stop_road.cars[-1]
+                    leaders.append((last_car, d_traveled + last_car.d - last_car.length / 2, p))
+                else:
+                    # sinon c'est son élément de signalisation actif
+                    leaders.append((stop_road.sign.dummy_car, d_traveled + stop_road.length, p))
+
+            elif end == len(chain_roads) and next_roads is not None:
+                # sinon, on cherche plus loin
+                d_traveled = sum(lengths[i:], d_traveled)
+                if d_traveled > self.horizon:
+                    return
+
+                for next_road_id in next_roads:
+                    searcher(next_road_id, d_traveled, p * next_roads[next_road_id])
+
+        for start_road, p in starts:
+            if start_road.id in self.position:
+                searcher(start_road.id, 0, p)
+
+        return leaders
+
+
+class EventScheduler:
+    tolerance = 1e-9  # s, avance avec laquelle un évènement peut être déclenché, pour les erreurs d'arrondi sur le temps
+
+    def __init__(self):
+        """
+        Échéancier des évènements de la simulation : changements d'état des feux et créations de voitures des CarFactory
+        dont les instants sont connus à l'avance. Les évènements sont gardés dans un tas selon leur instant, et ne coûtent
+        rien entre deux déclenchements, contrairement à une vérification à chaque pas.
+
+        Un évènement est associé à une route et à une action ``action(t) -> float | None`` qui est exécutée pendant
+        l'actualisation de la route, au premier pas dont l'instant ``t`` a atteint celui de l'évènement, et qui renvoie
+        l'instant de l'évènement suivant, ou None s'il n'y en a plus.
+
+        Ainsi, pour l'échéancier, une itération de la simulation se déroule généralement de la manière suivante :      \n
+        - la simulation récupère les évènements arrivés à échéance, regroupés par route
+        - en actualisant chaque route concernée, elle exécute leurs actions, puis les évènements suivants sont programmés
+        """
+        self.queue = []  # tas des évènements, de la forme (instant, numéro, indice de la route, action)
+        self.count = 0  # nombre d'évènements programmés, pour départager les évènements simultanés dans leur ordre d'ajout
+
+    def __repr__(self):
+        return f"EventScheduler(events={len(self.queue)}, next_time={self.next_time})"
+
+    def schedule(self, t: float, road_index: int, action: Callable[[float], float | None]):
+        """Programme un évènement à l'instant ``t`` pour la route d'indice ``road_index``."""
+        if t is None or t == INF:
+            return
+
+        heappush(self.queue, (t, self.count, road_index, action))
+        self.count += 1
+
+    @property
+    def next_time(self):
+        """Instant du prochain évènement, +inf s'il n'y en a pas."""
+        return self.queue[0][0] if self.queue else INF
+
+    def next_time_after(self, t: float):
+        """Instant du premier évènement qui ne sera pas déclenché à l'instant ``t``, +inf s'il n'y en a pas."""
+        return min((event[0] for event in self.queue if event[0] > t + self.tolerance), default=INF)
+
+    def pop_due(self, t: float) -> dict[int, list[tuple[float, Callable]]]:
+        """Retire les évènements arrivés à échéance à l'instant ``t`` et renvoie le dictionnaire qui à l'indice d'une
+        route associe ses évènements ``(instant, action)``, dans l'ordre chronologique."""
+        due = {}
+        while self.queue and self.queue[0][0] <= t + self.tolerance:
+            event_t, _, road_index, action = heappop(self.queue)
+            due.setdefault(road_index, []).append((event_t, action))
+        return due
+
+    def fire(self, road_index: int, events: list[tuple[float, Callable]]):
+        """Exécute les actions d'évènements d'une route et programme les évènements suivants."""
+        for event_t, action in events:
+            self.schedule(action(event_t), road_index, action)
+
+
+class TimeStepController:
+    growth_max = 2  # facteur d'augmentation maximum du pas de temps d'un pas au suivant
+    safety = 0.9  # facteur de sécurité sur le pas de temps donné par l'estimation de l'erreur
+    gap_fraction = 0.25  # part maximum de l'écart avec un leader qu'une voiture peut rattraper en un pas
+    event_delay = 1e-9  # s, délai après un évènement auquel le pas de temps arrive, pour que l'évènement ait eu lieu
+
+    def __init__(self, dt_min: float, dt_max: float, tolerance: float):
+        """
+        Contrôleur du pas de temps adaptatif, pour les simulations sans affichage avec un schéma balistique (voir
+        ``update_ballistic``). Le pas de temps est le plus grand possible tant que :
+
+        - l'erreur locale de position estimée, de l'ordre de ``jerk * dt³ / 6`` où le jerk est estimé par la variation
+          des accélérations au pas précédent, reste sous ``tolerance``
+        - aucune voiture ne rattrape plus de ``gap_fraction`` de l'écart avec ses leaders, ce qui raccourcit les pas
+          près des arrêts et des feux
+        - aucune voiture ne peut atteindre un capteur qui ne l'a pas encore vue ou changer plus d'une fois de route,
+          même à accélération maximum : le passage devant un capteur se fait donc pendant un pas de ``dt_min``, comme
+          avec le pas de temps fixe
+        - de même, aucune voiture en prévision de collision ne se rapproche de plus de ``gap_fraction`` de sa distance
+          aux voitures qu'elle va percuter
+
+        Les changements d'état des feux, les créations de voitures et la fin de la simulation tombent exactement au début
+        d'un pas, à ``event_delay`` près. Le pas peut alors être plus petit que ``dt_min``.
+
+        Args:
+            dt_min: pas de temps minimum hors évènements, celui de la simulation à pas fixe
+            dt_max: pas de temps maximum
+            tolerance: erreur de position tolérée sur un pas, en pixels
+        """
+        self.dt_min = dt_min
+        self.dt_max = dt_max
+        self.tolerance = tolerance
+        self.dt = dt_min  # dernier pas de temps, sans tenir compte des évènements
+        self.error_dt = dt_max  # pas de temps donné par l'estimation de l'erreur
+        self.prev_a = {}  # voiture -> accélération au début du pas
+
+    def __repr__(self):
+        return f"TimeStepController(dt_min={self.dt_min}, dt_max={self.dt_max}, tolerance={self.tolerance}, dt={self.dt})"
+
+    @staticmethod
+    def car_dt(car, colliding_cars) -> float:
+        """Renvoie le pas de temps maximum pour une voiture, selon ses leaders, les voitures qu'elle va percuter, les
+        capteurs et les routes devant elle."""
+        dt = INF
+
+        # écart avec les leaders
+        for leader, gap, _ in car.leaders:
+            closing_v = car.v - leader.v
+            if closing_v > 0:
+                dt = min(dt, TimeStepController.gap_fraction * max(gap, 0) / closing_v)
+
+        # distance aux voitures qu'elle va percuter (voir Car.virtual_leader)
+        for other_car in colliding_cars:
+            gap = distance(car.pos, other_car.pos) - car.length / 2 - other_car.length / 2
+            closing_v = car.v - other_car.v * (car.road.vd @ other_car.road.vd)
+            if closing_v > 0:
+                dt = min(dt, TimeStepController.gap_fraction * max(gap, 0) / closing_v)
+
+        # distance au prochain capteur ou à la fin de la prochaine route
+        road, next_road = car.road, car.next_road
+        dd = road.next_sensor_d(car.d) - car.d
+
+        if next_road is not None:
+            dd = min(dd, road.length - car.d + next_road.length)
+            if next_road.sensors_d:
+                dd = min(dd, road.length - car.d + next_road.sensors_d[0])
+
+        if dd < INF:
+            dt = min(dt, time_to_travel(dd, car.v, max(car.a_max, car.a)))
+
+        return dt
+
+    def next_dt(self, simulation) -> float:
+        """Renvoie le prochain pas de temps de la simulation."""
+        t = simulation.t
+        cars = [car for road in simulation.roads for car in road.cars]
+
+        dt = min(self.dt_max, self.error_dt, self.growth_max * self.dt)
+        for car in cars:
+            dt = min(dt, self.car_dt(car, simulation.predicted_collisions.get(car, ())))
+        dt = max(dt, self.dt_min)
+
+        self.dt = dt
+        self.prev_a = {car: car.a for car in cars}
+
+        # évènements : changements d'état des feux, créations de voitures, fin de la simulation
+        if any(road.car_factory.is_polled for road in simulation.roads):  # instants inconnus : on garde le pas fixe
+            dt = min(dt, self.dt_min)
+
+        if simulation.event_scheduler is None:
+            simulation.schedule_events()
+        next_event = min(simulation.duration, simulation.event_scheduler.next_time_after(t))
+        if t + dt > next_event:
+            dt = max(next_event - t, 0) + self.event_delay
+
+        return dt
+
+    def observe(self, dt: float):
+        """Met à jour l'estimation de l'erreur après un pas de durée ``dt``."""
+        da_max = max((abs(car.a - a) for car, a in self.prev_a.items()), default=0)
+
+        if da_max > 0:
+            jerk = da_max / dt
+            self.error_dt = self.safety * np.cbrt(6 * self.tolerance / jerk)
+        else:
+            self.error_dt = self.dt_max
@@ -1,13 +1,41 @@
 import traceback
+from importlib import import_module
+from contextvars import ContextVar
+from itertools import combinations
+from bisect import bisect_right
 from typing import *
 from numpy.typing import NDArray
 import numpy as np
-import webcolors
 
-from .settings import simulation_configuration as sc
+from .settings import sc, active_configuration, SimulationConfiguration
 from .constants import *
 
 
+class LazyModule:
+    def __init__(self, name: str):
+        """Module importé seulement à la première utilisation d'un de ses attributs, pour que l'import de traffsimpy
+        reste rapide : l'affichage (pygame), les graphes (matplotlib), les DataFrame (pandas) et les noms des couleurs
+        (webcolors) ne sont pas nécessaires aux simulations sans affichage. Après l'import, les attributs du module sont
+        copiés dans l'objet, et leur accès ne coûte pas plus qu'avec le module lui-même.
+
+        Args:
+            name: nom complet du module, par exemple ``"matplotlib.pyplot"``
+        """
+        self._lazy_module_name = name
+
+    def __repr__(self):
+        return f"LazyModule(name={self._lazy_module_name})"
+
+    def __getattr__(self, attr):
+        # appelée seulement pour les attributs qui ne sont pas encore copiés dans l'objet
+        module = import_module(self._lazy_module_name)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+webcolors = LazyModule("webcolors")
+
+
 np.seterr(all="raise", under="ignore")  # change la gestion des erreurs de maths (division par zéro, racine de négatif...)
 npa = np.array  # raccourcis pour les fonctions numpy de base
 npz = np.zeros
@@ -17,36 +45,333 @@ Coordinates: TypeAlias = NDArray[np.float64]  # définition du type Coordinates
 Color: TypeAlias = tuple[int, int, int]  # définition du type Color = (r, g, b)
 
 _sentinel = object()  # sentinel pour get_by_id
+active_simulation = ContextVar("active_simulation", default=None)  # simulation active du contexte, voir Simulation.activate()
 
 
 def empty_function(*_, **__): ...  # fonction qui à tout associe rien
 
 
-def new_id(obj, obj_id: int | None = None, pos=False) -> int:
-    """Crée et renvoie un identifiant d'objet."""
-    if obj_id in sc.dynamic_data["ids"]:  # si l'identifiant est déjà pris, on grogne
-        raise ValueError(f"L'identifiant {obj_id} est déjà utilisé.")
-
-    if not sc.dynamic_data["ids"]:  # s'il convient pas, idem
+def dynamic_data() -> dict:
+    """Renvoie les données dynamiques de la simulation active : identifiants des objets et attributs surveillés par des
+    capteurs."""
+    simulation = active_simulation.get()
+    if simulation is None:
         raise Exception("Vous devez d'abord créer une simulation avant de définir tout autre objet.")
+    return simulation.dynamic_data
+
+
+def new_id(obj, obj_id: int | None = None, pos=False, simulation=None) -> int:
+    """Crée et renvoie un identifiant d'objet, dans le registre de ``simulation`` ou, par défaut, de la simulation
+    active. Les identifiants automatiques suivent le plus grand ou précèdent le plus petit jamais attribué, gardés à
+    jour sans parcourir le registre, et ne sont donc jamais réutilisés, même après le retrait d'une voiture (voir
+    ``Simulation.retire_car``)."""
+    data = dynamic_data() if simulation is None else simulation.dynamic_data
+    ids = data["ids"]
+
+    if obj_id in ids:  # si l'identifiant est déjà pris, on grogne
+        raise ValueError(f"L'identifiant {obj_id} est déjà utilisé.")
 
     if obj_id is not None and not (isinstance(obj_id, int) and obj_id > 0):
         raise ValueError(f"Un identifiant doit être un entier strictement positif, pas {obj_id}.")
 
     if obj_id is None:  # si aucun identifiant fourni
         if pos:  # s'il est demandé que l'identifiant soit positif
-            obj_id = max(sc.dynamic_data["ids"].keys()) + 1  # on prend celui après le plus grand
+            obj_id = data["max_id"] + 1  # on prend celui après le plus grand
         else:
-            obj_id = min(sc.dynamic_data["ids"].keys()) - 1  # sinon, on prend celui avant le plus petit
+            obj_id = data["min_id"] - 1  # sinon, on prend celui avant le plus petit
 
-    sc.dynamic_data["ids"][obj_id] = obj  # on associe l'objet à son identifiant
+    ids[obj_id] = obj  # on associe l'objet à son identifiant
+    data["max_id"], data["min_id"] = max(data["max_id"], obj_id), min(data["min_id"], obj_id)
 
     return obj_id
 
 
 def get_by_id(obj_id: int, default=_sentinel) -> Any:
-    """Renvoie l'objet associé à l'identifiant donné."""
-    return sc.dynamic_data["ids"].get(obj_id, default) if default != _sentinel else sc.dynamic_data["ids"][obj_id]
+    """Renvoie l'objet associé à l'identifiant donné, dans le registre de la simulation active."""
+    ids = dynamic_data()["ids"]
+    return ids.get(obj_id, default) if default != _sentinel else ids[obj_id]
+
+
+class RandomStream:
+    def __init__(self, generator: np.random.Generator, block_size: int | None = None):
+        """Flux de nombres aléatoires propre à un composant (CarFactory, CarSorter), tirés par blocs de ``block_size``
+        avec son ``numpy.random.Generator`` puis consommés un à un : un tirage ne coûte alors presque plus rien. Les
+        blocs se suivant dans le flux du générateur, les tirages ne dépendent pas de ``block_size``.
+
+        Args:
+            generator: générateur du composant, dérivé de la graine de la simulation (voir
+                ``Simulation.random_generator``)
+            block_size: nombre de tirages par bloc, ``sc.random_block_size`` par défaut
+        """
+        self.generator = generator
+        self.block_size = sc.random_block_size if block_size is None else block_size
+        self.buffer = []  # tirages uniformes sur [0, 1) restants, le prochain à la fin
+
+    def __repr__(self):
+        return f"RandomStream(block_size={self.block_size}, buffered={len(self.buffer)})"
+
+    def random(self) -> float:
+        """Renvoie un nombre aléatoire uniforme sur [0, 1)."""
+        if not self.buffer:
+            self.buffer = self.generator.random(self.block_size)[::-1].tolist()
+        return self.buffer.pop()
+
+    def uniform(self, a: float, b: float) -> float:
+        """Renvoie un nombre aléatoire uniforme sur [a, b)."""
+        return a + (b - a) * self.random()
+
+    def integers(self, low: int, high: int) -> int:
+        """Renvoie un entier aléatoire uniforme entre ``low`` inclus et ``high`` exclus."""
+        return low + int((high - low) * self.random())
+
+
+class AliasTable:
+    def __init__(self, values: Sequence, probs: Sequence[float]):
+        """
+        Table des alias (méthode de Vose), pour tirer un élément de ``values`` selon les probabilités ``probs`` en temps
+        constant, sans recalculer ni vérifier les probabilités à chaque tirage comme ``np.random.choice``. Chaque
+        élément a une colonne de hauteur 1 / n, complétée si besoin par un autre élément, son alias : un nombre uniforme
+        sur [0, 1) donne la colonne par sa partie entière une fois multiplié par n, puis l'élément ou son alias selon
+        sa partie fractionnaire.
+
+        Args:
+            values: éléments à tirer
+            probs: probabilités des éléments, normalisées si leur somme ne vaut pas 1
+        """
+        n = len(values)
+        self.values = list(values)
+        self.threshold = np.ones(n)  # part de chaque colonne occupée par son élément, le reste par son alias
+        self.alias = np.arange(n)  # alias de chaque colonne
+
+        scaled_probs = npa(probs, dtype=float) * n / sum(probs)
+        small = [k for k in range(n) if scaled_probs[k] < 1]
+        large = [k for k in range(n) if scaled_probs[k] >= 1]
+        while small and large:
+            # la colonne d'un élément trop peu probable est complétée par un élément trop probable
+            k_small, k_large = small.pop(), large.pop()
+            self.threshold[k_small], self.alias[k_small] = scaled_probs[k_small], k_large
+            scaled_probs[k_large] -= 1 - scaled_probs[k_small]
+            (small if scaled_probs[k_large] < 1 else large).append(k_large)
+
+    def __repr__(self):
+        return f"AliasTable(values={self.values}, threshold={self.threshold}, alias={self.alias})"
+
+    def sample(self, u: NDArray) -> list:
+        """Renvoie les éléments tirés à partir des nombres uniformes sur [0, 1) ``u``, un par nombre."""
+        x = u * len(self.values)
+        k = x.astype(int)
+        indices = np.where(x - k < self.threshold[k], k, self.alias[k])
+        return [self.values[i] for i in indices.tolist()]
+
+
+class ColumnBuffer:
+    def __init__(self, dtypes: Mapping[str, type], capacity: int = 64):
+        """
+        Table de données en colonnes typées, des tableaux NumPy préalloués auxquels les lignes sont ajoutées une à une,
+        la capacité étant doublée dès que nécessaire. Une colonne est lue en une fois et sans copie avec
+        ``buffer[name]``.
+
+        Args:
+            dtypes: dictionnaire qui au nom d'une colonne associe son type, ``object`` pour des valeurs quelconques
+            capacity: nombre initial de lignes
+        """
+        self.capacity = capacity
+        self.size = 0  # nombre de lignes
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+
+    def __repr__(self):
+        return f"ColumnBuffer(columns={list(self.columns)}, size={self.size})"
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name: str) -> NDArray:
+        return self.columns[name][:self.size]
+
+    def append(self, *row):
+        """Ajoute une ligne, ses valeurs étant dans l'ordre des colonnes."""
+        if self.size == self.capacity:
+            self.grow()
+
+        for column, val in zip(self.columns.values(), row):
+            column[self.size] = val
+        self.size += 1
+
+    def grow(self):
+        """Double la capacité de la table."""
+        self.capacity *= 2
+
+        for name, old_column in self.columns.items():
+            column = np.empty(self.capacity, dtype=old_column.dtype)
+            column[:self.size] = old_column[:self.size]
+            self.columns[name] = column
+
+
+def accumulate_from(start: float, gaps: NDArray) -> NDArray:
+    """Renvoie les sommes cumulées de ``gaps`` à partir de ``start``, calculées de proche en proche : les arrondis sont
+    les mêmes que les sommes soient faites en un bloc ou en plusieurs."""
+    return np.cumsum(np.concatenate(([start], gaps)))[1:]
+
+
+class ArrivalSchedule:
+    def __init__(self, freq: float | Sequence[float] | dict, generator: np.random.Generator, window: float | None = None):
+        """
+        Instants de création de voitures d'une CarFactory, générés à l'avance par blocs avec numpy : jusqu'à la fin de
+        la simulation si sa durée est connue (voir ``horizon``), sinon par fenêtres glissantes de ``window`` secondes.
+        Tous les tirages sont des nombres uniformes sur [0, 1) pris dans l'ordre du flux de ``generator``, donc les
+        instants générés ne dépendent ni de la fenêtre ni de la durée de la simulation.
+
+        La fréquence peut être de type :                                                                              \n
+        - ``a`` ou ``[a, a]`` : une création toutes les a secondes, à partir de 0
+        - ``[a, b]`` : une pause aléatoire uniforme entre a et b secondes entre deux créations
+        - ``{"rate": r}`` : des arrivées poissoniennes de taux r voitures par seconde
+        - ``{"rate": [(t0, r0), (t1, r1), ...]}`` : des arrivées poissoniennes de taux rk à partir de l'instant tk,
+          nul avant t0, par exemple pour une heure de pointe
+        - ``{"rate": f, "rate_max": m}`` : des arrivées poissoniennes de taux ``f(t) <= m``, générées par amincissement
+          (thinning), ``f`` pouvant être vectorisée
+
+        Un taux qui reste nul (après une heure de pointe par exemple) ne fait pas générer de fenêtres vides sans fin :
+        la génération s'arrête à l'horizon s'il est connu, et sinon ``next_after`` renvoie la fin de la fenêtre vide,
+        instant auquel la génération reprend.
+
+        Args:
+            freq: fréquence de création
+            generator: générateur de la CarFactory, dérivé de la graine de la simulation (voir
+                ``Simulation.random_generator``)
+            window: durée des fenêtres de génération, ``sc.car_fact_schedule_window`` par défaut
+        """
+        self.generator = generator
+        self.window = sc.car_fact_schedule_window if window is None else window
+        self.horizon = INF  # fin de la simulation, jusqu'à laquelle les instants sont générés d'un coup, définie par la simulation
+        self.times = []  # instants de création générés, triés
+        self.index = 0  # position dans self.times du premier instant pas encore dépassé
+
+        if isinstance(freq, dict):
+            rate = freq["rate"]
+            if callable(rate):
+                # taux fonction du temps, amincissement d'arrivées de taux rate_max
+                self.kind = "intensity"
+                self.rate_func, self.rate_max = rate, freq["rate_max"]
+            elif isinstance(rate, (int, float)):
+                self.kind = "poisson"
+                self.rate_max = rate
+            else:
+                # taux constant par morceaux, amincissement d'arrivées de taux le taux maximum
+                self.kind = "piecewise"
+                starts, rates = zip(*rate)
+                self.starts, self.rates = npa(starts, dtype=float), npa(rates, dtype=float)
+                self.rate_max = self.rates.max()
+            self.mean_rate = self.rate_max
+        elif isinstance(freq, (tuple, list)) and freq[0] != freq[1]:
+            self.kind = "uniform"
+            self.gap_min, self.gap_max = freq
+            self.mean_rate = 2 / (self.gap_min + self.gap_max)
+        else:
+            self.kind = "constant"
+            self.period = freq[0] if isinstance(freq, (tuple, list)) else freq
+            self.mean_rate = 1 / self.period
+            self.k = 0  # numéro de la prochaine création générée
+
+        # dernier instant généré (candidat dans le cas d'un amincissement), à partir duquel la génération reprend
+        self.last = -self.period if self.kind == "constant" else 0.0
+
+    def __repr__(self):
+        return f"ArrivalSchedule(kind={self.kind}, last={self.last}, buffered={len(self.times) - self.index})"
+
+    @property
+    def exhausted(self) -> bool:
+        """Renvoie si plus aucune création ne peut être générée."""
+        if self.kind in ("poisson", "intensity", "piecewise") and self.rate_max <= 0:
+            return True
+        return self.kind == "piecewise" and self.rates[-1] <= 0 and self.last >= self.starts[-1]
+
+    def rate(self, times: NDArray) -> NDArray:
+        """Renvoie le taux d'arrivée aux instants ``times``, pour un amincissement."""
+        if self.kind == "piecewise":
+            k = np.searchsorted(self.starts, times, side="right") - 1
+            return np.where(k >= 0, self.rates[np.maximum(k, 0)], 0)
+
+        try:
+            return np.broadcast_to(self.rate_func(times), times.shape)
+        except (TypeError, ValueError):
+            # fonction non vectorisée
+            return npa([self.rate_func(t) for t in times], dtype=float)
+
+    def extend(self, t_end: float):
+        """Génère les instants de création jusqu'à ``t_end`` au moins."""
+        blocks = []
+
+        while self.last < t_end and not self.exhausted:
+            n = int((t_end - self.last) * self.mean_rate) + 16  # nombre de créations attendues, plus une marge
+
+            if self.kind == "constant":
+                # multiples de la période, sans accumuler les erreurs d'arrondi
+                times = self.period * np.arange(self.k, self.k + n)
+                self.k += n
+                self.last = times[-1]
+
+            elif self.kind == "uniform":
+                gaps = self.gap_min + (self.gap_max - self.gap_min) * self.generator.random(n)
+                times = accumulate_from(self.last, gaps)
+                self.last = times[-1]
+
+            elif self.kind == "poisson":
+                gaps = -np.log1p(-self.generator.random(n)) / self.rate_max  # lois exponentielles
+                times = accumulate_from(self.last, gaps)
+                self.last = times[-1]
+
+            else:
+                # amincissement : des candidats de taux rate_max, chacun gardé avec une probabilité rate(t) / rate_max
+                u = self.generator.random((n, 2))
+                candidates = accumulate_from(self.last, -np.log1p(-u[:, 0]) / self.rate_max)
+                times = candidates[u[:, 1] * self.rate_max < self.rate(candidates)]
+                self.last = candidates[-1]
+
+            blocks.append(times)
+
+        # liste Python pour que la lecture d'un instant ne coûte presque rien
+        self.times = self.times[self.index:] + np.concatenate(blocks).tolist() if blocks else self.times
+        self.index = 0
+
+    def fill(self, t: float) -> float | None:
+        """Génère des instants de création s'il n'en reste plus : jusqu'à l'horizon s'il n'est pas encore atteint, sinon
+        pour une fenêtre après ``t``. Renvoie None s'il en reste, et sinon l'instant jusqu'auquel aucune création n'est
+        à attendre : +inf si plus aucune ne peut être générée (taux nul ou horizon atteint), ou la fin de la fenêtre
+        générée vide, à laquelle la génération doit reprendre."""
+        while self.index >= len(self.times):
+            if self.exhausted or self.last >= self.horizon:
+                return INF
+
+            start = max(t, self.last)
+            t_end = self.horizon if start < self.horizon < INF else start + self.window
+            self.extend(t_end)
+
+            if self.index >= len(self.times) and self.horizon == INF:
+                return t_end  # fenêtre vide, par exemple avec un taux nul pendant un moment
+        return None
+
+    def next_after(self, t: float) -> float:
+        """Renvoie le premier instant de création strictement après ``t``, en oubliant les précédents. S'il n'y en a
+        pas, renvoie +inf si plus aucun ne peut être généré, ou sinon l'instant auquel la génération reprend, qui n'est
+        pas un instant de création (voir ``pop_due``)."""
+        while (no_creation_until := self.fill(t)) is None:
+            self.index = bisect_right(self.times, t, self.index)
+            if self.index < len(self.times):
+                return self.times[self.index]
+        return no_creation_until
+
+    def pop_due(self, t: float) -> bool:
+        """Oublie les instants de création jusqu'à ``t`` inclus, et renvoie s'il y en avait."""
+        if self.fill(t) is not None:
+            return False
+        index = bisect_right(self.times, t, self.index)
+        due, self.index = index > self.index, index
+        return due
+
+
+def stream_key(obj_id: int) -> int:
+    """Renvoie un entier positif propre à l'identifiant ``obj_id``, éventuellement négatif, pour dériver une graine."""
+    return 2 * obj_id if obj_id >= 0 else -2 * obj_id - 1
 
 
 def norm(v: Coordinates):
@@ -97,6 +422,35 @@ def update_taylor(car, dt: float):
         car.d += car.v * dt + 1 / 2 * car.a * dt * dt  # devéloppement de Taylor à l'ordre 2
 
 
+def update_ballistic(car, dt: float):
+    """Calcule les vecteurs du mouvement de la voiture avec un schéma balistique, exact pour une accélération constante
+    pendant ``dt`` : contrairement à ``update_taylor``, la distance est calculée avec la vitesse du début du pas, et la
+    voiture s'arrête exactement si sa vitesse s'annule pendant le pas. Adapté aux grands pas de temps.
+
+    Args:
+        car: voiture dont la vitesse et la distance doivent être mis à
+            jour
+        dt: durée du mouvement
+    """
+    if car.v + car.a * dt < 0:  # si la voiture s'arrête pendant le pas
+        car.d -= 1 / 2 * car.v * car.v / car.a
+        car.v = 0
+    else:
+        car.d += car.v * dt + 1 / 2 * car.a * dt * dt
+        car.v += car.a * dt
+
+
+def time_to_travel(dd: float, v: float, a: float) -> float:
+    """Renvoie le temps mis pour parcourir la distance ``dd`` à partir de la vitesse ``v`` avec une accélération
+    constante ``a`` positive ou nulle."""
+    if a > 0:
+        return (np.sqrt(v * v + 2 * a * dd) - v) / a
+    elif v > 0:
+        return dd / v
+    else:
+        return INF
+
+
 def idm(car, leader_coords: tuple[float, float] | None) -> float:
     """Calcul l'accélération d'une voiture d'après l'*Intelligent Driver Model*."""
     if leader_coords is not None:  # si on a un leader
@@ -151,6 +505,163 @@ def iidm(car, leader_coords: tuple[float, float] | None) -> float:
                 return a_free_road
 
 
+def idm_batch(delta_d: NDArray, v: NDArray, lead_v: NDArray, has_leader: NDArray, params: Mapping[str, NDArray]) -> NDArray:
+    """Version vectorisée de ``idm`` : calcule en une fois les accélérations de plusieurs voitures d'après
+    l'*Intelligent Driver Model*.
+
+    Args:
+        delta_d: distances aux leaders, prises en compte seulement là où ``has_leader`` est vrai
+        v: vitesses des voitures
+        lead_v: vitesses des leaders, prises en compte seulement là où ``has_leader`` est vrai
+        has_leader: si chaque voiture a un leader
+        params: paramètres des voitures, ``v_max``, ``a_max``, ``a_exp``, ``delta_d_min`` et ``t_react``
+    """
+    v_max, a_max, a_exp = params["v_max"], params["a_max"], params["a_exp"]
+    delta_d_min, t_react = params["delta_d_min"], params["t_react"]
+
+    with np.errstate(all="ignore"):  # les voitures sans leader peuvent produire des inf et des nan, ignorés ensuite
+        delta_v = v - lead_v
+        desired_delta_d = delta_d_min + np.maximum(0, v * t_react + v * delta_v / np.sqrt(2 * sc.a_min_conf * a_max))
+        delta_d = np.where(delta_d == 0, 1e-4, delta_d)
+        a_interaction = np.where(has_leader, (desired_delta_d / delta_d) ** 2, 0)
+
+        a_free_road = 1 - np.float_power(v / v_max, a_exp)
+
+        return a_max * (a_free_road - a_interaction)
+
+
+def iidm_batch(delta_d: NDArray, v: NDArray, lead_v: NDArray, has_leader: NDArray, params: Mapping[str, NDArray]) -> NDArray:
+    """Version vectorisée de ``iidm`` : calcule en une fois les accélérations de plusieurs voitures d'après
+    l'*Improved Intelligent Driver Model*.
+
+    Args:
+        delta_d: distances aux leaders, prises en compte seulement là où ``has_leader`` est vrai
+        v: vitesses des voitures
+        lead_v: vitesses des leaders, prises en compte seulement là où ``has_leader`` est vrai
+        has_leader: si chaque voiture a un leader
+        params: paramètres des voitures, ``v_max``, ``a_max``, ``a_exp``, ``delta_d_min`` et ``t_react``
+    """
+    v_max, a_max, a_exp = params["v_max"], params["a_max"], params["a_exp"]
+    delta_d_min, t_react = params["delta_d_min"], params["t_react"]
+
+    with np.errstate(all="ignore"):  # les branches non retenues par np.where peuvent produire des inf et des nan
+        under_v_max = v <= v_max
+
+        # accélération sur route libre, selon que la voiture dépasse ou non sa limite de vitesse
+        a_free_under = a_max * (1 - np.float_power(v / v_max, a_exp))
+        a_free_over = - sc.a_min_conf * (1 - np.float_power(v_max / v, a_max * a_max / sc.a_min_conf))
+        a_free_road = np.where(under_v_max, a_free_under, a_free_over)
+
+        # terme d'interaction avec le leader
+        delta_v = v - lead_v
+        desired_delta_d = delta_d_min + np.maximum(0, v * t_react + v * delta_v / np.sqrt(2 * sc.a_min_conf * a_max))
+        z = np.where(delta_d > 0, desired_delta_d / delta_d, INF)
+        a_interaction = a_max * (1 - z * z)
+
+        a_z_under = np.where(a_free_under > 0, a_free_under * (1 - np.float_power(z, 2 * a_max / a_free_under)), 0)
+        a_leader_under = np.where(z >= 1, a_interaction, a_z_under)
+        a_leader_over = np.where(z >= 1, a_free_over + a_interaction, a_free_over)
+        a_leader = np.where(under_v_max, a_leader_under, a_leader_over)
+
+        return np.where(has_leader, a_leader, a_free_road)
+
+
+class CarFollowingModel:
+    # paramètres des voitures utilisés par le modèle
+    PARAMS = ("v_max", "a_max", "a_exp", "delta_d_min", "t_react")
+
+    def __init__(self, scalar_func: Callable | None = None, batch_func: Callable | None = None):
+        """
+        Modèle de poursuite (*car-following model*), qui donne l'accélération d'une voiture en fonction de la distance
+        à et de la vitesse de son leader. Un modèle fournit une fonction vectorisée, qui prend des tableaux de
+        distances, de vitesses, de vitesses des leaders et de paramètres des voitures et renvoie un tableau
+        d'accélérations, et éventuellement une fonction scalaire pour une seule voiture, plus rapide sur une seule
+        valeur. Sans fonction scalaire, la fonction vectorisée est utilisée sur des tableaux de taille 1.
+
+        Pour ajouter un modèle, il suffit de créer un ``CarFollowingModel`` avec ses fonctions, ou de dériver cette
+        classe, puis de l'assigner à ``simulation_configuration.car_following_model``.
+
+        Args:
+            scalar_func: éventuelle fonction ``f(car, leader_coords) -> float``, voir ``idm``
+            batch_func: fonction ``f(delta_d, v, lead_v, has_leader, params) -> NDArray``, voir ``idm_batch``
+        """
+        self.scalar_func = scalar_func
+        self.batch_func = batch_func
+
+    def __repr__(self):
+        return f"CarFollowingModel(batch_func={getattr(self.batch_func, '__name__', self.batch_func)})"
+
+    def acceleration(self, car, leader_coords: tuple[float, float] | None) -> float:
+        """Renvoie l'accélération d'une voiture, d'après son leader virtuel ``(distance, vitesse)`` ou None."""
+        if self.scalar_func is not None:
+            return self.scalar_func(car, leader_coords)
+
+        has_leader = leader_coords is not None
+        delta_d, lead_v = leader_coords if has_leader else (INF, 0)
+        params = {param: npa([getattr(car, param)], dtype=float) for param in self.PARAMS}
+        return self.accelerations(npa([delta_d]), npa([car.v]), npa([lead_v]), npa([has_leader]), params)[0]
+
+    def accelerations(self, delta_d: NDArray, v: NDArray, lead_v: NDArray, has_leader: NDArray,
+                      params: Mapping[str, NDArray]) -> NDArray:
+        """Renvoie les accélérations de plusieurs voitures, voir ``idm_batch``."""
+        return self.batch_func(delta_d, v, lead_v, has_leader, params)
+
+
+CAR_FOLLOWING_MODELS = {"idm": CarFollowingModel(idm, idm_batch), "iidm": CarFollowingModel(iidm, iidm_batch)}
+
+
+def car_following_model(config: SimulationConfiguration | None = None) -> CarFollowingModel:
+    """Renvoie le modèle de poursuite de la configuration ``config``, ou de la configuration active par défaut, donné
+    par son nom ou directement."""
+    model = (sc if config is None else config).car_following_model
+    return CAR_FOLLOWING_MODELS[model] if isinstance(model, str) else model
+
+
+def cars_geometry(pos: NDArray, vd: NDArray, length: NDArray, width: NDArray, v: NDArray, delta_d_min: NDArray,
+                  t_react: NDArray) -> tuple[NDArray, NDArray, NDArray, NDArray]:
+    """Version vectorisée de ``Car.compute_geometry`` : calcule en une fois les polygones de ``n`` voitures.
+
+    Args:
+        pos: positions des centres des voitures, de forme ``(n, 2)``
+        vd: vecteur(s) directeur(s) normé(s) des routes, de forme ``(2,)`` si toutes les voitures sont sur la même
+            route ou ``(n, 2)``
+        length: longueurs des voitures
+        width: largeurs des voitures
+        v: vitesses des voitures
+        delta_d_min: distances minimum entre deux voitures
+        t_react: temps de réaction des conducteurs
+
+    Returns:
+        les sommets d'affichage, de la zone de collision devant et de la zone de collision autour de forme
+        ``(n, 4, 2)``, et les boites englobantes de forme ``(n, 2, 2)``
+    """
+    vd = np.broadcast_to(vd, pos.shape)
+    vn = np.stack((-vd[:, 1], vd[:, 0]), axis=1)  # vecteurs normaux aux routes, normés comme vd
+
+    vd_l = vd * (length / 2)[:, None]  # vecteurs directeurs normés pour la longueur des voitures
+    vn_w = vn * (width / 2)[:, None]  # vecteurs normaux normés pour la largeur des voitures
+    vn_ddm = vn * (delta_d_min / 2)[:, None]  # vecteurs normaux normés pour la zone de collision devant
+    vd_ddm = vd * (delta_d_min / 2)[:, None]  # vecteurs directeurs normés pour la distance de sécurité
+    vd_ddmp = vd * (delta_d_min + v * t_react)[:, None]  # idem en prenant en compte la vitesse
+
+    # sommets d'affichage : derrière droit, derrière gauche, devant gauche, devant droit
+    vertices = np.stack((pos + vn_w - vd_l, pos - vn_w - vd_l, pos - vn_w + vd_l, pos + vn_w + vd_l), axis=1)
+
+    # sommets de la zone de collision devant : devant droit, devant gauche, derrière gauche, derrière droit
+    front_bumper_hitboxes = np.stack((pos + vn_w + vd_l + vd_ddmp, pos - vn_w + vd_l + vd_ddmp,
+                                      pos - vn_w - vn_ddm + vd_l, pos + vn_w + vn_ddm + vd_l), axis=1)
+
+    # sommets de la zone de collision autour : derrière droit, derrière gauche, devant gauche, devant droit
+    side_bumper_hurtboxes = np.stack((pos + vn_w + vn_ddm - vd_l - vd_ddm, pos - vn_w - vn_ddm - vd_l - vd_ddm,
+                                      pos - vn_w - vn_ddm + vd_l, pos + vn_w + vn_ddm + vd_l), axis=1)
+
+    # sommets inférieurs gauches et supérieurs droits des AABB
+    corners = np.concatenate((side_bumper_hurtboxes[:, :2], side_bumper_hurtboxes[:, 2:] + vd_ddmp[:, None]), axis=1)
+    aabbs = np.stack((corners.min(axis=1), corners.max(axis=1)), axis=1)
+
+    return vertices, front_bumper_hitboxes, side_bumper_hurtboxes, aabbs
+
+
 def lines_intersection(p1: Coordinates, vd1: Coordinates, p2: Coordinates, vd2: Coordinates) -> Coordinates:
     """Renvoie le point d'intersections de deux droites grâce à un de leurs points et leurs vecteurs directeurs."""
     x1, y1 = p1
@@ -230,6 +741,84 @@ def do_polygons_intersect(polygon1: Sequence[Coordinates], polygon2: Sequence[Co
     return True
 
 
+def edge_normals(polygons: NDArray) -> NDArray:
+    """Renvoie des vecteurs normaux (non normés) aux arêtes de polygones de forme ``(n, k, 2)``, la i-ème arête allant du
+    i-ème sommet au suivant. Le résultat est de forme ``(n, k, 2)``."""
+    edges = np.roll(polygons, -1, axis=1) - polygons
+    return np.stack((-edges[..., 1], edges[..., 0]), axis=-1)
+
+
+def do_polygons_intersect_batch(polygons1: NDArray, polygons2: NDArray, axes: NDArray) -> NDArray:
+    """Version vectorisée de ``do_polygons_intersect`` : détermine si les polygones convexes ``polygons1[k]`` et
+    ``polygons2[k]`` s'intersectent, pour tout ``k``.
+
+    Args:
+        polygons1: sommets des premiers polygones, de forme ``(n, k1, 2)``
+        polygons2: sommets des seconds polygones, de forme ``(n, k2, 2)``
+        axes: axes de séparation à tester pour chaque couple, de forme ``(n, m, 2)``, qui doivent contenir les normales
+            aux arêtes des deux polygones et n'ont pas besoin d'être normés
+    """
+    proj1 = np.einsum("nkc,nmc->nmk", polygons1, axes)  # projections des sommets sur chaque axe
+    proj2 = np.einsum("nkc,nmc->nmk", polygons2, axes)
+
+    # un axe sépare les polygones si les segments obtenus par projection ne s'intersectent pas
+    separated = (proj1.min(axis=2) >= proj2.max(axis=2)) | (proj2.min(axis=2) >= proj1.max(axis=2))
+
+    return ~separated.any(axis=1)
+
+
+def aabbs_overlap(aabbs1: NDArray, aabbs2: NDArray) -> NDArray:
+    """Renvoie si les boites englobantes droites de ``aabbs1`` et ``aabbs2``, de forme ``(n, 2, 2)``, s'intersectent
+    deux à deux (bords compris)."""
+    return np.all((aabbs1[:, 0] <= aabbs2[:, 1]) & (aabbs2[:, 0] <= aabbs1[:, 1]), axis=1)
+
+
+def grid_candidate_pairs(aabbs: NDArray, cell_size: float) -> tuple[NDArray, NDArray]:
+    """Renvoie les couples d'indices ``(i, j)``, avec ``i < j``, des boites englobantes droites qui s'intersectent, en
+    utilisant une grille uniforme (*spatial hash*) : chaque boite est rangée dans les cellules qu'elle recouvre et
+    seules les boites d'une même cellule sont comparées. Un couple n'est gardé que dans la cellule qui contient le coin
+    inférieur gauche de l'intersection des deux boites, pour ne pas le compter plusieurs fois.
+
+    Args:
+        aabbs: boites englobantes, de forme ``(n, 2, 2)``
+        cell_size: côté des cellules, au moins égal à la plus grande dimension des boites pour que chacune ne
+            recouvre pas plus de 2×2 cellules
+    """
+    n = len(aabbs)
+    if n < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    cells = np.floor(aabbs / cell_size).astype(np.int64)  # cellules des coins des boites, de forme (n, 2, 2)
+
+    # chaque boite recouvre les cellules de ses quatre coins, éventuellement confondues
+    cars_idx = np.repeat(np.arange(n), 4)
+    cells_x = np.stack((cells[:, 0, 0], cells[:, 1, 0], cells[:, 0, 0], cells[:, 1, 0]), axis=1).ravel()
+    cells_y = np.stack((cells[:, 0, 1], cells[:, 0, 1], cells[:, 1, 1], cells[:, 1, 1]), axis=1).ravel()
+    entries = np.unique(np.stack((cells_x, cells_y, cars_idx), axis=1), axis=0)  # triées par cellule puis indice
+
+    # regroupement par cellule et génération des couples de chaque cellule
+    new_cell = np.any(entries[1:, :2] != entries[:-1, :2], axis=1)
+    bounds = np.concatenate(([0], np.flatnonzero(new_cell) + 1, [len(entries)]))
+    pairs = []  # couples d'indices avec la cellule où ils ont été trouvés
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end - start > 1:
+            cell_x, cell_y = entries[start, :2].tolist()
+            pairs.extend((i, j, cell_x, cell_y) for i, j in combinations(entries[start:end, 2].tolist(), 2))
+
+    if not pairs:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    i, j, cell_x, cell_y = npa(pairs, dtype=np.int64).T
+
+    # on garde les couples dont les boites s'intersectent, dans la cellule du coin de leur intersection
+    corner_cells = np.floor(np.maximum(aabbs[i, 0], aabbs[j, 0]) / cell_size).astype(np.int64)
+    keep = aabbs_overlap(aabbs[i], aabbs[j]) & (corner_cells[:, 0] == cell_x) & (corner_cells[:, 1] == cell_y)
+    i, j = i[keep], j[keep]
+
+    order = np.lexsort((j, i))
+    return i[order], j[order]
+
+
 def red_to_blue_gradient(shade: float):
     """Renvoie une couleur entre bleu et route selon la valeur de ``shade``, avec environ
     0 -> rouge,
@@ -1,13 +1,18 @@
+from copy import copy
+from contextvars import ContextVar
+
 from .constants import *
-import yaml
 
 
 class SimulationConfiguration:
+    _frozen = False  # si la configuration est une copie figée, voir snapshot()
+
     def __init__(self):
         """Paramètres de la simulation."""
         # Affichage
         self.print_detailed_logs = False  # si on affiche les détails de la simulation quand l'utilisateur met en pause ou quand le programme s'arrête
         self.print_errors = True  # si on affiche les erreurs quand le programme se plante
+        self.print_greetings = False  # si on affiche le message de bienvenue et les commandes à l'ouverture de la fenêtre
         self.background_color = BLUE_BG  # couleur de l'arrière plan de la fenêtre
         self.info_background_color = BLUE_TXT_BG  # couleur de l'arrière plan du texte
         self.show_infos = True  # si on affiche le suivi du temps, la vitesse et l'état de la simulation
@@ -20,8 +25,18 @@ class SimulationConfiguration:
         self.max_speed = 4  # vitesse maximum possible, peu d'effets au-delà de 4 pour un processeur classique avec affichage
         self.scale = 10  # pixels/m, échelle de la simulation
         self.average_leaders = False  # méthode pour déterminer le leader de la première voiture d'une route (moyenne/plus proche)
+        self.leaders_horizon = INF  # m, distance maximum parcourue en aval d'une route pour trouver les leaders de sa première voiture
         self.use_hitboxes = True  # si la simulation utilise les hitbox et hurtbox des voitures pour éviter les collisions
+        self.broad_phase = "grid"  # méthode de recherche des couples de voitures en potentielle collision : "grid" (grille uniforme), "sweep_and_prune" (balayage incrémental) ou "naive" (tous les couples)
+        self.grid_min_cars = 16  # nombre de voitures en dessous duquel la phase "broad" "grid" compare tous les couples, moins coûteux pour peu de voitures
+        self.narrow_phase = "batch"  # méthode de test des couples de voitures en potentielle collision : "batch" (tous les couples à la fois) ou "pairwise" (couple par couple)
         self.screenshot_type = "jpg"  # format des captures d'écran : jpg, png, bmp ou tga
+        self.use_vectorized_engine = False  # si l'état des voitures est stocké dans des tableaux NumPy et mis à jour pour toutes les voitures à la fois
+        self.adaptive_time_step = False  # si les simulations sans affichage utilisent un pas de temps adaptatif et un schéma balistique
+        self.dt_max = 0.5  # s, pas de temps maximum avec le pas de temps adaptatif
+        self.dt_tolerance = 0.01  # m, erreur de position tolérée sur un pas avec le pas de temps adaptatif
+        self.multi_rate = False  # si les routes au trafic calme sont actualisées moins souvent, avec un pas plus grand (moteur non vectorisé et pas de temps fixe, voir Road.rate_class)
+        self.multi_rate_max_class = 3  # classe de rythme maximum : les routes les plus calmes sont actualisées tous les 2**multi_rate_max_class pas
 
         # Ressources
         self.font_path = DEF_FONT_PATH  # chemin à la police de caractère du texte
@@ -46,6 +61,8 @@ class SimulationConfiguration:
         self.car_fact_rand_length_max = 7.0  # m, maximum pour les longueurs aléatoires des voitures
         self.car_fact_rand_width_min = 1.8  # m, minimum pour les largeurs aléatoires des voitures
         self.car_fact_rand_width_max = 2.4  # m, maximum pour les largeurs aléatoires des voitures
+        self.car_fact_schedule_window = 60  # s, durée sur laquelle les instants de création des CarFactory sont générés à la fois, pour les simulations sans fin (voir ArrivalSchedule)
+        self.random_block_size = 256  # nombre de tirages aléatoires faits à la fois par chaque CarFactory et CarSorter, puis consommés un à un (voir RandomStream)
 
         # Voitures
         self.car_a = 0  # m/s², accéleration par défaut des voitures
@@ -71,6 +88,7 @@ class SimulationConfiguration:
         self.a_min_conf = 1.5  # m/s², décélération confortable d'une voiture en valeur absolue
         self.a_exp = 4  # exposant de l'accéleration, contrôle la "douceur"
         self.t_react = 1  # s, temps de réaction du conducteur
+        self.car_following_model = "iidm"  # modèle de poursuite : "idm", "iidm" ou un CarFollowingModel
 
         # Feu de signalisation et panneau stop
         self.tl_red_delay = 30  # s, durée du feu rouge
@@ -92,21 +110,41 @@ class SimulationConfiguration:
         self.sensor_color = PURPLE_SENSOR  # couleur du trait représentant un capteur
         self.sensor_width = 3  # largeur du trait représentant un capteur
         self.sensor_file_prefix = ""  # préfixe des fichiers Excel des capteurs
+        self.history_decimation = 1  # les attributs en fonction du temps (d(t), v(t), a(t)) sont enregistrés tous les history_decimation pas (voir CarHistory)
+        self.history_retention = INF  # s, durée pendant laquelle les attributs en fonction du temps sont gardés, les plus vieux étant écrasés au-delà
+        self.history_capacity = 4096  # nombre initial d'échantillons de l'historique des attributs en fonction du temps, doublé si besoin
 
         # Paramètres rapides
         self._debug = False
         self._use_idm = True
         self._presentation_mode = False
 
-        # Données dynamiques
-        self.dynamic_data = {"ids": {}, "atm_sensors": {}}
-
         # Sauvegarde des paramètres par défaut
         self.def_settings = self.__dict__.copy()
 
     def __str__(self):
         return str(self.__dict__)
 
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"La configuration d'une simulation est figée, le paramètre {name} ne peut pas être "
+                                 f"modifié : les paramètres doivent être définis avant la création de la simulation.")
+        super().__setattr__(name, value)
+
+    def snapshot(self):
+        """Renvoie une copie figée de la configuration, dont les paramètres ne peuvent plus être modifiés."""
+        config = copy(self)
+        object.__setattr__(config, "_frozen", True)
+        return config
+
+    def replace(self, **settings):
+        """Renvoie une copie figée de la configuration, avec les paramètres ``settings`` modifiés."""
+        config = copy(self)
+        object.__setattr__(config, "_frozen", False)
+        config.load_dict(settings)
+        object.__setattr__(config, "_frozen", True)
+        return config
+
     @property
     def debug(self):
         return self._debug
@@ -147,9 +185,42 @@ class SimulationConfiguration:
 
     def load_yaml(self, file_path: str):
         """Charge une configuration donnée sous forme de fichier YAML."""
+        import yaml  # importé ici pour ne pas ralentir l'import de traffsimpy
+
         with open(file_path, "r") as config_file:
             config = yaml.safe_load(config_file)
             self.load_dict(config)
 
 
-simulation_configuration = SimulationConfiguration()
+class ConfigurationProxy:
+    __slots__ = ()
+
+    def __init__(self):
+        """
+        Configuration active, utilisée par tout le code de traffsimpy sous le nom ``sc`` : chaque attribut est lu dans
+        la configuration figée de la simulation active du contexte (voir ``Simulation.activate``), ou dans la
+        configuration par défaut ``simulation_configuration`` si aucune simulation n'est active. Plusieurs simulations
+        peuvent ainsi coexister, dans des threads différents ou l'une après l'autre dans le même thread.
+
+        Les boucles critiques peuvent récupérer une fois pour toutes la configuration figée avec ``sc.active()``, puis
+        lire ses attributs directement.
+        """
+
+    def __repr__(self):
+        return f"ConfigurationProxy(frozen={self.active()._frozen})"
+
+    @staticmethod
+    def active() -> SimulationConfiguration:
+        """Renvoie la configuration active."""
+        return active_configuration.get()
+
+    def __getattr__(self, name):
+        return getattr(active_configuration.get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(active_configuration.get(), name, value)
+
+
+simulation_configuration = SimulationConfiguration()  # configuration par défaut, copiée à la création de chaque simulation
+active_configuration = ContextVar("active_configuration", default=simulation_configuration)  # configuration de la simulation active du contexte
+sc = ConfigurationProxy()
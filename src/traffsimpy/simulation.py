@@ -1,16 +1,32 @@
 from time import time, strftime
+from heapq import heappush, heappop
+from functools import partial
 
-import pygame.event
-from matplotlib import pyplot as plt
-
+from .settings import simulation_configuration, SimulationConfiguration
 from .components import *
+from .engine import *
+from .collisions import *
 from .drawing import *
 
 
+plt = LazyModule("matplotlib.pyplot")  # importé seulement pour les graphes des capteurs
+
+
 class Simulation:
-    def __init__(self, title: str = "TraffSimPy", width: int | None = None, height: int | None = None):
+    def __init__(self, title: str = "TraffSimPy", width: int | None = None, height: int | None = None,
+                 config: SimulationConfiguration | None = None, seed: int | None = None):
         """Simulation du trafic.
 
+        La simulation utilise une copie figée de la configuration ``config``, ou de ``simulation_configuration`` par
+        défaut, faite à sa création : les paramètres doivent donc être définis avant. Elle a son propre registre
+        d'objets, et devient la simulation active du contexte (voir ``activate``), à laquelle sont rattachés les objets
+        créés ensuite. Les objets donnés à ses routes lui sont rattachés dans tous les cas (voir ``adopt``) : plusieurs
+        simulations peuvent être construites en alternance dans un même thread.
+
+        La fenêtre, la police et les images ne sont créées qu'au lancement d'une simulation avec affichage (voir
+        ``init_display``) : une simulation lancée avec ``run(display=False)`` n'utilise pas pygame, sauf pour détecter la
+        taille de l'écran si ``width`` ou ``height`` ne sont pas fournis.
+
         Args:
             title: titre de la fenêtre
             width: largeur de la fenêtre, en pixels. Détectée
@@ -19,25 +35,37 @@ class Simulation:
             height: hauteur de la fenêtre, en pixels. Détectée
                 automatiquement si non fourni, puis récupérable avec
                 ``Simulation.size[1]``.
+            config: éventuelle configuration, ``simulation_configuration``
+                par défaut
+            seed: graine des nombres aléatoires de la simulation, dont sont
+                dérivés les flux des CarFactory et CarSorter (voir
+                ``random_stream``). Aléatoire si non fournie, puis
+                récupérable avec ``Simulation.seed``.
         """
         self.id = 0
-        sc.dynamic_data = sc.def_settings["dynamic_data"]
-        sc.dynamic_data["ids"] = {0: self}
-        pygame.init()  # initialisation de pygame
+        self.seed = np.random.SeedSequence(seed).entropy  # graine de la simulation, tirée au hasard si non fournie
+        self.config = (simulation_configuration if config is None else config).snapshot()  # configuration figée
+        self.dynamic_data = {"ids": {0: self}, "max_id": 0, "min_id": 0, "atm_sensors": {}}  # registre des objets, identifiants extrêmes attribués et attributs surveillés par des capteurs
+        self.activate()
 
         self.title = title  # titre de la fenêtre
-        pygame.display.set_caption(title)  # modification du titre de la fenêtre
 
-        monitor_info = pygame.display.Info()  # récuparation de la taille de l'écran si non fournie (fonctionne plutôt mal)
-        if width is None:
-            width = monitor_info.current_w
-        if height is None:
-            height = monitor_info.current_h
+        if width is None or height is None:
+            pygame.display.init()  # initialisation de l'affichage pygame seul, pour la taille de l'écran
+            monitor_info = pygame.display.Info()  # récuparation de la taille de l'écran si non fournie (fonctionne plutôt mal)
+            if width is None:
+                width = monitor_info.current_w
+            if height is None:
+                height = monitor_info.current_h
         self.size = width, height  # taille de la fenêtre
 
         self.t = 0.0  # suivi du temps
+        self.step_count = 0  # nombre de pas effectués
         self.FPS = sc.fps  # images par seconde
         self.dt = 1 / sc.fps  # pas de temps
+        self.adaptive = False  # si le pas de temps est adaptatif, avec un schéma balistique (voir TimeStepController)
+        self.predicted_collisions = {}  # voitures en prévision de collision au dernier pas -> voitures qu'elles vont percuter
+        self.transferred_cars = {}  # voitures ayant changé de route pendant le pas, à ne pas bouger une seconde fois (seulement avec le pas de temps adaptatif : avec le pas fixe, ce second mouvement est négligeable et conservé)
         self.speed_ajusted_fps = sc.fps * sc.speed  # FPS ajusté pour la vitesse de la simulation
         self.speed = sc.speed  # vitesse de la simulation
         self.over = self.paused = False  # si la simulation est finie ou en pause
@@ -46,17 +74,23 @@ class Simulation:
         self.roads = []  # liste des routes
         self.road_graph = {}  # graphe des routes
         self.heavy_traffic_area = (npz(2), INF)  # zone où get_bumping_cars est utilisé
-
-        self.surface = pygame.display.set_mode(self.size)  # création de la fenêtre
-        self.clock = pygame.time.Clock()  # création de l'horloge pygame
+        self.vehicle_store = VehicleStore()  # stockage en colonnes des voitures, pour le moteur vectorisé
+        self.car_history = CarHistory(sc.scale, sc.history_capacity, sc.history_decimation, sc.history_retention)  # historique des attributs en fonction du temps des voitures, pour les capteurs
+        self.sweep_and_prune = SweepAndPrune()  # balayage incrémental pour la détection des collisions
+        self.road_conflicts = None  # table des couples de routes dont les voitures peuvent interagir, voir compute_road_conflicts()
+        self.downstream_index = None  # index des routes en aval de chaque route, pour get_road_leaders()
+        self.active_roads = None  # indices dans self.roads des routes actives (voir Road.is_active), recalculées si None
+        self.car_retirement_hook = None  # éventuelle fonction f(car) appelée quand une voiture quitte le réseau, par exemple pour archiver car.summary(t) (voir retire_car)
+        self.roads_to_visit = []  # tas des indices des routes actives restant à actualiser pendant le pas en cours
+        self.current_road_index = -1  # indice de la route en cours d'actualisation
+        self.event_scheduler = None  # échéancier des changements d'état des feux et des créations de voitures, recalculé si None
+
+        # ressources de l'affichage, créées dans init_display()
+        self.surface = None  # fenêtre
+        self.clock = None  # horloge pygame
         self.bg_color = sc.background_color  # couleur d'arrière-plan de la fenêtre
-        self.surface.fill(self.bg_color)  # coloriage de l'arrière-plan
-
-        self.FONT = pygame.font.Font(sc.font_path, sc.font_size)  # police d'écriture des informations
-        self.SMALL_FONT = pygame.font.Font(sc.font_path, round(sc.car_width * sc.scale * 0.8))  # pour les voitures
-        self.ARROW_IMG = pygame.image.load(sc.arrow_path).convert_alpha()  # chargement de l'image de flèche
-        self.SMALL_ARROW = pygame.transform.smoothscale(self.ARROW_IMG, (
-            sc.car_width * sc.scale * 0.8, sc.car_width * sc.scale * 0.8))
+        self.FONT = self.SMALL_FONT = None  # polices d'écriture des informations et des voitures
+        self.ARROW_IMG = self.SMALL_ARROW = None  # image de flèche, et sa version pour les voitures
 
         # générer l'image de flèche avec l'angle de la route est très long, on le fera qu'une fois au début de
         # start_loop() et on la stockera sous deux tailles dans ce dictionnaire
@@ -80,11 +114,89 @@ class Simulation:
         else:
             return npa([x, self.size[1] - y])
 
+    def activate(self):
+        """Fait de la simulation la simulation active du contexte (du thread) : ``sc`` lit sa configuration, et les objets
+        créés ensuite sont ajoutés à son registre. Appelée à la création de la simulation, au début de chaque pas et au
+        début des méthodes qui créent ou retrouvent des objets (``create_roads``, ``set_road_graph``,
+        ``compute_sensors_results``...), pour qu'elles agissent sur cette simulation même si une autre a été créée
+        depuis."""
+        active_simulation.set(self)
+        active_configuration.set(self.config)
+
+    def adopt(self, obj):
+        """Rattache à la simulation un objet (CarFactory, élément de signalisation, capteur) créé pendant qu'une autre
+        simulation était active, par exemple construit dans la liste des routes d'une simulation après la création d'une
+        autre : il passe du registre de l'autre simulation à celui-ci, en gardant l'identifiant fourni par
+        l'utilisateur, ou en recevant un nouvel identifiant automatique. Appelée par les routes pour les objets qui leur
+        sont donnés."""
+        if obj.simulation is self:
+            return
+
+        old_ids = obj.simulation.dynamic_data["ids"]
+        if old_ids.get(obj.id) is obj:
+            del old_ids[obj.id]
+
+        # un identifiant fourni par l'utilisateur est positif, les identifiants automatiques de ces objets négatifs
+        obj.id = new_id(obj, obj.id if obj.id > 0 else None, simulation=self)
+        obj.simulation = self
+
+    def random_generator(self, kind: str, obj_id: int) -> np.random.Generator:
+        """Renvoie un générateur aléatoire pour le composant de type ``kind`` (voir ``RANDOM_STREAM_KINDS``) de la route
+        d'identifiant ``obj_id``. Sa graine ne dépend que de celle de la simulation, du type du composant et de
+        l'identifiant de la route : les tirages d'un composant ne changent pas quand d'autres sont ajoutés ou créés dans
+        un autre ordre (pour des identifiants de routes fixés par l'utilisateur), et deux simulations de graines
+        différentes ont des flux indépendants."""
+        seed_sequence = np.random.SeedSequence(self.seed, spawn_key=(RANDOM_STREAM_KINDS.index(kind), stream_key(obj_id)))
+        return np.random.default_rng(seed_sequence)
+
+    def random_stream(self, kind: str, obj_id: int) -> RandomStream:
+        """Renvoie un flux aléatoire tiré par blocs pour le composant de type ``kind`` de la route d'identifiant
+        ``obj_id`` (voir ``random_generator``)."""
+        return RandomStream(self.random_generator(kind, obj_id))
+
+    def configure(self, **settings):
+        """Modifie des paramètres de la simulation, en remplaçant sa configuration figée par une copie modifiée. Les
+        objets déjà créés ne sont pas mis à jour : les paramètres qui servent à leur création (échelle, dimensions...)
+        doivent être définis avant."""
+        self.config = self.config.replace(**settings)
+        self.activate()
+
+    def init_display(self):
+        """Initialise pygame et crée la fenêtre, l'horloge, les polices et les images de la simulation, si ce n'est pas
+        déjà fait."""
+        if self.surface is not None:
+            return
+
+        if sc.print_greetings:
+            print(GREETINGS)  # message de bienvenue et commandes
+
+        pygame.init()  # initialisation de pygame
+        pygame.display.set_caption(self.title)  # modification du titre de la fenêtre
+
+        self.surface = pygame.display.set_mode(self.size)  # création de la fenêtre
+        self.clock = pygame.time.Clock()  # création de l'horloge pygame
+        self.surface.fill(self.bg_color)  # coloriage de l'arrière-plan
+
+        self.FONT = pygame.font.Font(sc.font_path, sc.font_size)  # police d'écriture des informations
+        self.SMALL_FONT = pygame.font.Font(sc.font_path, round(sc.car_width * sc.scale * 0.8))  # pour les voitures
+        self.ARROW_IMG = pygame.image.load(sc.arrow_path).convert_alpha()  # chargement de l'image de flèche
+        self.SMALL_ARROW = pygame.transform.smoothscale(self.ARROW_IMG, (
+            sc.car_width * sc.scale * 0.8, sc.car_width * sc.scale * 0.8))
+
+    def set_duration(self, duration: float):
+        """Définit la durée de la simulation, jusqu'à laquelle les instants de création des CarFactory sont générés :
+        l'échéancier est recalculé si elle change, les CarFactory ayant pu s'arrêter à l'ancienne durée."""
+        if duration != self.duration:
+            self.event_scheduler = None
+        self.duration = duration
+
     def start_loop(self, duration: float):
         """Lance la boucle de la simulation, en actualisant chaque élément et en les affichant ``FPS`` fois par
         seconde, pendant une durée ``duration``.
         """
-        self.duration = duration
+        self.activate()
+        self.set_duration(duration)
+        self.init_display()  # création de la fenêtre et des ressources de l'affichage
 
         # initialisation des images de flèches orientées dans le sens des routes
         for road in self.roads:
@@ -117,48 +229,20 @@ class Simulation:
             self.show_heavy_traffic_area()  # on affiche la zone où les collisions sont détectées
             self.show_roads(self.roads)  # on affiche les routes
 
+            for road in self.roads:
+                for car in road.cars:
+                    self.show_car(car)  # on affiche les voitures de la route
+                for sensor in road.sensors:
+                    self.show_sensor(sensor)  # on affiche les capteurs de la route
+                self.show_sign(road.sign)  # on affiche le feu/panneau stop
+
             if self.paused:  # si en pause
-                for road in self.roads:
-                    for car in road.cars:
-                        self.show_car(car)  # on affiche les voitures de la route
-                    for sensor in road.sensors:
-                        self.show_sensor(sensor)  # on affiche les capteurs de la route
-                    self.show_sign(road.sign)  # on affiche le feu/panneau stop
                 self.show_info(self.info_to_show)  # on affiche les informations
                 pygame.display.update()  # actualisation de la fenêtre
                 self.clock.tick(self.FPS)  # pause d'une durée dt
                 continue  # saute la suite de la boucle et passe à l'itération suivante
 
-            # mise à jour des interactions entre les voiture
-            if sc.use_hitboxes:
-                for car1, car2 in self.pair_of_cars_maybe_interacting():
-                    self.manage_cars_interaction(car1, car2)
-
-            # on actualise la simulation route par route
-            for road in self.roads:
-                # affichage des voitures de la route et mise à jour des prévisions de collision
-                for car in road.cars:
-                    self.show_car(car)
-
-                # affichage des capteurs de la route
-                for sensor in road.sensors:
-                    self.show_sensor(sensor)
-
-                # affichage de l'élément de signalisation (feu/panneau stop) de la route
-                self.show_sign(road.sign)
-
-                # actualisation des objets de la route
-                road_leaders = self.get_road_leaders(road, avg=sc.average_leaders)
-                road.update_cars(self.dt, road_leaders)
-                road.update_sensors(self.t)
-                road.update_sign(self.t)
-
-                # éventuelle création d'une nouvelle voiture au début de la route
-                if road.car_factory.freq_func is not None:
-                    new_car = road.car_factory.factory({"t": self.t}, {"t": self.t})
-                    road.new_car(new_car)
-
-            self.t += self.dt  # actualisation du suivi du temps
+            self.step()  # actualisation de la simulation
             self.show_info(self.info_to_show)  # affiche les informations
             pygame.display.update()  # actualisation de la fenêtre
             self.clock.tick(self.speed_ajusted_fps)  # pause d'une durée dt
@@ -166,32 +250,174 @@ class Simulation:
 
     def start_loop_no_display(self, duration: float, progression: bool = False):
         """Lance la boucle de la simulation pendant une durée ``duration``, sans affichage et à la vitesse maximum."""
-        self.duration = duration
+        self.activate()
+        self.set_duration(duration)
+
+        controller = None
+        if sc.adaptive_time_step:
+            # pas de temps adaptatif et schéma balistique, voir TimeStepController
+            controller = TimeStepController(self.dt, sc.dt_max, sc.dt_tolerance * sc.scale)
+            self.adaptive = True
 
         while self.t <= duration:  # tant que la simulation n'est pas terminée
-            if sc.use_hitboxes:
-                for car1, car2 in self.pair_of_cars_maybe_interacting():
-                    self.manage_cars_interaction(car1, car2)
+            if controller is not None:
+                self.dt = controller.next_dt(self)
 
-            # on actualise la simulation route par route
-            for road in self.roads:
-                # actualisation des objets de la route
+            self.step()  # actualisation de la simulation
+
+            if controller is not None:
+                controller.observe(self.dt)
+
+            if progression:
+                print(f"\rSimulation {tbold(self.title)} à {round(100 * self.t / self.duration)} %", end="")
+
+        if controller is not None:
+            self.dt = controller.dt_min
+            self.adaptive = False
+
+        if progression:
+            print("\r")
+
+    def step(self):
+        """Actualise la simulation d'un pas de temps ``dt`` : interactions entre les voitures, puis routes une par une
+        ou, avec le moteur vectorisé, toutes les voitures à la fois, les capteurs relevant les voitures qui les
+        dépassent pendant leur mouvement, puis signalisation et CarFactory."""
+        self.activate()
+        self.car_history.start_tick(self.step_count, self.t, any(self.dynamic_data["atm_sensors"].values()))
+        interacting_cars = {}  # voitures en potentielle interaction, dont soon_colliding_cars est à réinitialiser
+        self.transferred_cars = {}
+
+        # mise à jour des interactions entre les voitures
+        if sc.use_hitboxes:
+            pairs = self.pair_of_cars_maybe_interacting()
+
+            if sc.narrow_phase == "pairwise":
+                for car1, car2 in pairs:
+                    self.manage_cars_interaction(car1, car2)
+            else:
+                self.manage_cars_interactions(pairs)
+
+            for car1, car2 in pairs:
+                interacting_cars[car1] = interacting_cars[car2] = True
+
+            self.predicted_collisions = {car: list(car.soon_colliding_cars) for car in interacting_cars if car.soon_colliding_cars}
+
+        # seules les routes actives sont parcourues, dans l'ordre de self.roads : une route réveillée pendant le pas par
+        # l'arrivée d'une voiture est ajoutée au tas si elle n'a pas encore été dépassée (voir wake_road)
+        if self.active_roads is None:
+            self.update_active_roads()
+        active_roads = [self.roads[k] for k in sorted(self.active_roads)]
+
+        # évènements arrivés à échéance, déclenchés pendant l'actualisation de leurs routes
+        if self.event_scheduler is None:
+            self.schedule_events()
+        due_events = self.event_scheduler.pop_due(self.t)
+        self.roads_to_visit = sorted(self.active_roads.keys() | due_events.keys())  # une liste triée est un tas
+        self.current_road_index = -1
+
+        if sc.use_vectorized_engine:
+            # toutes les voitures sont actualisées à la fois à partir des leaders de chaque route
+            memo = {}  # les routes ne changent pas entre les recherches, qui partagent donc leurs parcours
+            roads_leaders = {road.id: self.get_road_leaders(road, avg=sc.average_leaders, memo=memo)
+                             for road in active_roads if road.cars}
+            self.vehicle_store.update(active_roads, roads_leaders, interacting_cars, self.dt, self.t, self.adaptive)
+
+        # actualisation à plusieurs rythmes : chaque route n'est actualisée que tous les 2**road.rate_class pas, ses
+        # voitures bougeant alors depuis leur dernière actualisation jusqu'à la fin du pas
+        multi_rate = self.multi_rate
+
+        # on actualise la simulation route par route
+        while self.roads_to_visit:
+            self.current_road_index = heappop(self.roads_to_visit)
+            road = self.roads[self.current_road_index]
+
+            # actualisation des objets de la route
+            if multi_rate:
+                if self.step_count % 2 ** road.rate_class == 0:
+                    road_leaders = self.get_road_leaders(road, avg=sc.average_leaders)
+                    road.update_cars(self.dt, road_leaders, until=self.t + self.dt)
+                    road.rate_class = road.compute_rate_class(self.heavy_traffic_area, sc.multi_rate_max_class)
+            elif not sc.use_vectorized_engine:
                 road_leaders = self.get_road_leaders(road, avg=sc.average_leaders)
                 road.update_cars(self.dt, road_leaders)
-                road.update_sensors(self.t)
-                road.update_sign(self.t)
 
-                # éventuelle création d'une nouvelle voiture au début de la route
-                if road.car_factory.freq_func is not None:
-                    new_car = road.car_factory.factory({"t": self.t}, {"t": self.t})
-                    road.new_car(new_car)
+            # changements d'état du feu et créations de voitures programmés, ou éventuelle création d'une nouvelle
+            # voiture si la fonction de fréquence de création est à appeler à chaque pas
+            if road.index in due_events:
+                self.event_scheduler.fire(road.index, due_events[road.index])
+            if road.car_factory.is_polled:
+                self.add_created_car(road, road.car_factory.factory({"t": self.t}, {"t": self.t}))
 
-            self.t += self.dt  # actualisation du suivi du temps
+            if not road.is_active:
+                self.active_roads.pop(road.index, None)  # la route ne sera plus actualisée jusqu'à l'arrivée d'une voiture
 
-            if progression:
-                print(f"\rSimulation {tbold(self.title)} à {round(100 * self.t / self.duration)} %", end="")
+        self.current_road_index = len(self.roads)
+        self.t += self.dt  # actualisation du suivi du temps
+        self.step_count += 1
+
+    @property
+    def multi_rate(self):
+        """Si l'actualisation à plusieurs rythmes est utilisée : seulement avec le moteur orienté objet et le pas de
+        temps fixe."""
+        return sc.multi_rate and not sc.use_vectorized_engine and not self.adaptive
+
+    def add_created_car(self, road: Road, car: Car | None):
+        """Ajoute à une route une voiture créée par sa CarFactory pendant le pas en cours."""
+        if car is not None and self.multi_rate:
+            car.sync_t = self.t + self.dt  # comme sans plusieurs rythmes, elle bougera à partir du prochain pas
+        road.new_car(car)
 
-        print("\r")
+    def schedule_events(self):
+        """Crée l'échéancier des évènements à partir de l'instant actuel : changements d'état des feux non statiques et
+        créations de voitures des CarFactory dont les instants sont connus à l'avance (voir ``EventScheduler``)."""
+        if self.active_roads is None:
+            self.update_active_roads()  # numérotation des routes
+
+        self.event_scheduler = EventScheduler()
+
+        for road in self.roads:
+            if isinstance(road.sign, TrafficLight) and not road.sign.static:
+                # l'état actuel du feu est calculé, puis son prochain changement est programmé
+                road.sign.update(self.t)
+                self.event_scheduler.schedule(road.sign.next_change(self.t), road.index, road.sign.change_state)
+
+            if road.car_factory.is_scheduled:
+                # les instants de création sont générés jusqu'à la fin de la simulation, et une création à l'instant
+                # actuel est aussi programmée
+                road.car_factory.arrivals.horizon = self.duration
+                next_creation = road.car_factory.next_creation(self.t - EventScheduler.tolerance)
+                self.event_scheduler.schedule(next_creation, road.index, partial(self.scheduled_creation, road))
+
+    def scheduled_creation(self, road: Road, t: float):
+        """Action d'une création de voiture programmée sur une route, renvoie l'instant de la prochaine création."""
+        car, next_t = road.car_factory.scheduled_creation(t)
+        self.add_created_car(road, car)
+        return next_t
+
+    def retire_car(self, car: Car):
+        """Retire une voiture qui quitte le réseau du registre des objets, après avoir appelé l'éventuelle fonction
+        ``self.car_retirement_hook(car)`` : la simulation ne garde alors plus aucune référence à la voiture, qui est
+        libérée avec son historique."""
+        if self.car_retirement_hook is not None:
+            self.car_retirement_hook(car)
+        self.dynamic_data["ids"].pop(car.id, None)
+
+    def update_active_roads(self):
+        """Numérote les routes selon leur position dans ``self.roads`` et calcule l'ensemble des routes actives, qui
+        sont les seules actualisées à chaque pas (voir ``Road.is_active``)."""
+        for k, road in enumerate(self.roads):
+            road.index = k
+        self.active_roads = {road.index: None for road in self.roads if road.is_active}
+
+    def wake_road(self, road: Road):
+        """Ajoute une route aux routes actives, quand une voiture y entre. Si la route n'a pas encore été actualisée
+        pendant le pas en cours, elle l'est à son tour."""
+        if self.active_roads is None or road.index in self.active_roads:
+            return
+
+        self.active_roads[road.index] = None
+        if road.index > self.current_road_index:
+            heappush(self.roads_to_visit, road.index)
 
     def run(self, duration: float = INF, display=True):
         """Lance la simulation."""
@@ -201,6 +427,8 @@ class Simulation:
         if not self.roads:
             raise NotImplementedError("Aucune route n'a été définie. Vous pouvez définir des routes avec create_roads().")
 
+        self.activate()
+
         try:
             starting_time = time()
 
@@ -220,6 +448,8 @@ class Simulation:
 
     def print_simulation_info(self):
         """Affiche l'ensemble des objets de la simulation et leurs principaux attributs dans la sortie standard."""
+        self.activate()
+
         if sc.print_detailed_logs:
             print(f"\n{tbold('--- Simulation Info ---')}\n\n{self.size = }\n{self.t = }\n{self.FPS = }\n{self.dt = }\n{self.speed = }\n{self.speed_ajusted_fps = }\n{self.paused = }\n{self.over = }\n{self.dragging = }\n{self.off_set = }\n{self.road_graph = }\n")
             for road in self.roads:
@@ -287,6 +517,13 @@ class Simulation:
 
     def create_road(self, **kw):
         """Créer une route, renvoie la route."""
+        self.activate()
+
+        self.road_conflicts = None  # la table des conflits entre routes sera à recalculer
+        self.downstream_index = None  # de même pour l'index des routes en aval
+        self.active_roads = None  # et pour les routes actives
+        self.event_scheduler = None  # et pour l'échéancier des évènements
+
         # récupération des paramètres communs à tous les types de route
         road_type = kw.get("type", kw.get("t", "road"))  # type ou son alias t, par défaut road
         start = kw.get("start", kw.get("s", (0, 0)))  # start ou son alias s, par défaut (0, 0)
@@ -330,7 +567,7 @@ class Simulation:
             sensors = kw.get("sensors", kw.get("srs"))  # sensors ou son alias srs, par défaut None
             road = Road(start=start, end=end, color=color, v_max=v_max, with_arrows=with_arrows, priority=priority,
                         heavily_traveled=heavily_traveled, car_factory=car_factory, sign=sign, sensors=sensors,
-                        obj_id=obj_id)
+                        obj_id=obj_id, simulation=self)
 
             self.roads.append(road)
 
@@ -338,7 +575,7 @@ class Simulation:
             n = kw.get("n", sc.arcroad_num_of_sroads)  # n, par défaut sc.arcroad_num_of_sroads
             road = ArcRoad(start=start, end=end, vdstart=vdstart, vdend=vdend, n=n, v_max=v_max,
                            with_arrows=with_arrows, heavily_traveled=heavily_traveled, color=color, priority=priority,
-                           obj_id=obj_id)
+                           obj_id=obj_id, simulation=self)
 
             for sroad in road.sroads[::-1]:
                 self.roads.append(sroad)
@@ -369,7 +606,11 @@ class Simulation:
         - ``sensors`` pour road, le ou les éventuels capteurs de la route
         - ``with_arrow`` pour road, si des flèches seront affichées sur la route dans le sens de la circulation
         """
-        return [self.create_road(**road) for road in road_list]
+        self.activate()
+
+        roads = [self.create_road(**road) for road in road_list]
+        self.compute_road_conflicts()
+        return roads
 
     def set_road_graph(self, graph: dict):
         """Définie le graphe des routes de la simulation. Prend en argument le graphe des routes, qui est un dictionnaire
@@ -383,6 +624,8 @@ class Simulation:
         Args:
             graph: graphe des routes
         """
+        self.activate()
+
         processed_graph = {}
 
         def process_next_roads(nrs):
@@ -416,7 +659,9 @@ class Simulation:
 
         for road_id in processed_graph:
             road = get_by_id(road_id)
-            road.car_sorter = CarSorter(processed_graph[road_id])
+            car_sorter = CarSorter(processed_graph[road_id])
+            car_sorter.road = road  # car_sorter.road.setter crée son flux aléatoire
+            road.car_sorter = car_sorter
 
             if road.car_sorter.method == "user func":
                 processed_graph[road_id] = None
@@ -425,6 +670,26 @@ class Simulation:
                 processed_graph[road_id] = {processed_graph[road_id]: 1}
 
         self.road_graph = processed_graph
+        self.downstream_index = DownstreamIndex(self.roads, self.road_graph, sc.leaders_horizon * sc.scale)
+        self.compute_road_conflicts()
+
+    def compute_road_conflicts(self):
+        """Calcule la table des couples de routes dont les voitures peuvent interagir (voir ``RoadConflicts``), pour des
+        voitures dont les attributs sont majorés par les valeurs par défaut, celles des CarFactory et celles des voitures
+        déjà présentes. Appelée après ``create_roads`` et ``set_road_graph``, puis à nouveau si une voiture dépassant ces
+        bornes entre sur une route."""
+        if not self.roads:
+            self.road_conflicts = None
+            return
+
+        cars = [car for road in self.roads for car in road.cars]
+        length = max([sc.car_length * sc.scale, sc.car_fact_rand_length_max * sc.scale] + [car.length for car in cars])
+        width = max([sc.car_width * sc.scale, sc.car_fact_rand_width_max * sc.scale] + [car.width for car in cars])
+        delta_d_min = max([sc.delta_d_min * sc.scale] + [car.delta_d_min for car in cars])
+        v = max([road.v_max for road in self.roads] + [max(car.v, car.v_max) for car in cars])
+        t_react = max([sc.t_react] + [car.t_react for car in cars])
+
+        self.road_conflicts = RoadConflicts(self.roads, length, width, delta_d_min, v, t_react)
 
     def set_heavy_traffic_area(self, center: Union[tuple[float, float], Coordinates] = None, radius: float = INF):
         """Définie la zone circulaire où le trafic sera probablement dense et où la simulation utilisera les hitbox et
@@ -437,7 +702,7 @@ class Simulation:
             radius: rayon du disque décrivant la zone, en **pixels**,
                 +inf par défaut
         """
-        sc.use_hitboxes = True
+        self.configure(use_hitboxes=True)
 
         if center is None:
             center = self.size[0] / 2, self.size[1] / 2
@@ -556,6 +821,8 @@ class Simulation:
 
     def compute_sensors_results(self, *sensors_id, since=0, how_many=INF):
         """Calcule les résultats de capteurs."""
+        self.activate()
+
         if not sensors_id:
             for road in self.roads:
                 for sensor in road.sensors:
@@ -575,6 +842,8 @@ class Simulation:
 
     def print_sensors_results(self, *sensors_id):
         """Affiche les résulats de capteurs dans la sortie standard."""
+        self.activate()
+
         if not sensors_id:
             for road in self.roads:
                 for sensor in road.sensors:
@@ -592,6 +861,8 @@ class Simulation:
 
     def export_sensors_results(self, *sensors_id, describe: bool = True):
         """Exporte les résultats de capteurs dans des fichiers Excel .xlsx."""
+        self.activate()
+
         if not sensors_id:
             for road in self.roads:
                 for sensor in road.sensors:
@@ -603,6 +874,8 @@ class Simulation:
 
     def plot_sensors_results(self, *sensors_id, **plot_kwargs):
         """Affiche les résulats de capteurs sous forme d'un graphe de fonctions."""
+        self.activate()
+
         if not sensors_id:
             for road in self.roads:
                 for sensor in road.sensors:
@@ -618,88 +891,116 @@ class Simulation:
 
         plt.show()
 
-    def get_road_leaders(self, road, avg=False):
+    def get_road_leaders(self, road, avg=False, memo: dict = None):
         """Renvoie les éventuels leaders de la première voiture de la route, dans une liste de tuples de la forme
-        ``(voiture, distance, proba)``.
+        ``(voiture, distance, proba)``. Le parcours en profondeur des routes suivantes utilise l'index des routes en aval
+        ``self.downstream_index`` (voir ``DownstreamIndex``), calculé une fois pour toutes.
 
         Args:
             road: route à traiter
             avg: si le parcours se fait selon toutes les prochaines routes possibles ou selon la prochaine route de la
                 première voiture
+            memo: éventuel dictionnaire partagé entre les recherches faites sans que les routes ne changent, pour ne pas
+                parcourir plusieurs fois les mêmes routes vides
         """
         if not road.cars:  # si la route n'a pas de voitures, le résultat du parcours ne sera pas utilisé
             return []
 
-        already_seen_roads_id = {}  # routes déjà vues
-        leaders = []  # résultat du parcours : liste de tuples (voiture, distance, proba)
-
-        def searcher(start_road: Road, d_traveled: float, p: float):
-            """Parcours en profondeur des routes de la simulation depuis la route r. Rempli la liste leaders lorsque
-            la route possède au moins une voiture ou un élément de signalisation actif, cherche plus loin sinon.
-
-            Args:
-                start_road: départ du parcours
-                d_traveled: distance déjà parcourue
-                p: probabilité d'arriver sur cette route
-            """
-            if start_road.id in already_seen_roads_id:
-                # si on est déjà passé sur la route, on fait rien
-                return
-            else:
-                # sinon on la marque comme déjà vue
-                already_seen_roads_id[start_road.id] = 1
-
-            if start_road.cars:
-                # si la route possède au moins une voiture, on prend la dernière
-                last_car = start_road.cars[-1]
-                leaders.append((last_car, d_traveled + last_car.d - last_car.length / 2, p))
-
-            elif start_road.sign.dummy_car is not None:
-                # si elle a un élément de signalisation actif, on le prend lui
-                leaders.append((start_road.sign.dummy_car, d_traveled + start_road.length, p))
-
-            else:
-                # sinon, on cherche plus loin
-                next_rds_ids = self.road_graph.get(start_road.id)
-                if next_rds_ids is None:  # si pas de prochaine route, on s'arrête
-                    return
-
-                else:
-                    for next_rd_id in next_rds_ids:
-                        next_p = next_rds_ids[next_rd_id]
-                        searcher(get_by_id(next_rd_id), d_traveled + start_road.length, p * next_p)
+        if self.downstream_index is None:
+            self.downstream_index = DownstreamIndex(self.roads, self.road_graph, sc.leaders_horizon * sc.scale)
 
         if avg:
-            next_roads_ids = self.road_graph.get(road.id)
-
-            if next_roads_ids is not None:
-                for next_road_id in next_roads_ids:
-                    proba = next_roads_ids[next_road_id]
-                    searcher(get_by_id(next_road_id), 0, proba)
+            next_roads_ids = self.road_graph.get(road.id) or {}
+            starts = [(get_by_id(next_road_id), next_roads_ids[next_road_id]) for next_road_id in next_roads_ids]
 
         else:
             first_car: Car = road.cars[0]
 
             if first_car.next_road is None:
-                leaders = self.get_road_leaders(road, True)
-            else:
-                searcher(first_car.next_road, 0, 1)
+                return self.get_road_leaders(road, True, memo)
 
-        return leaders
+            starts = [(first_car.next_road, 1)]
 
-    def pair_of_cars_maybe_interacting(self):
-        """Renvoie la liste des couples de voitures en potentielle interaction (bientôt en collision, etc...), en
-        utilisant des conditions nécessaires et peu coûteuses à calculer, mais pas suffisantes. Correspond à la phase
-        "broad" dans la détection de collisions.
-        """
-        # construction de la liste des voitures de la simulation dans la zone de trafic dense
+        return self.downstream_index.leaders(starts, memo)
+
+    def cars_in_heavy_traffic_area(self):
+        """Renvoie la liste des voitures de la simulation dans la zone de trafic dense."""
         cars = []
         for road in self.roads:
             for car in road.cars:
                 if road.is_heavily_traveled or is_inside_circle(car.pos, self.heavy_traffic_area):
                     cars.append(car)
+        return cars
+
+    def pair_of_cars_maybe_interacting(self):
+        """Renvoie la liste des couples de voitures en potentielle interaction (bientôt en collision, etc...), en
+        utilisant des conditions nécessaires et peu coûteuses à calculer, mais pas suffisantes. Correspond à la phase
+        "broad" dans la détection de collisions, faite selon ``simulation_configuration.broad_phase``.
+        """
+        cars = self.cars_in_heavy_traffic_area()
+
+        if self.road_conflicts is None:
+            self.compute_road_conflicts()
+
+        if sc.broad_phase == "naive":
+            return self.naive_broad_phase(cars, self.road_conflicts)
+        elif sc.broad_phase == "sweep_and_prune":
+            return self.sweep_and_prune_broad_phase(cars)
+        else:
+            return self.grid_broad_phase(cars, self.road_conflicts)
+
+    @staticmethod
+    def grid_broad_phase(cars: list[Car], road_conflicts: RoadConflicts | None = None):
+        """Phase "broad" utilisant une grille uniforme (*spatial hash*) dont les cellules ont pour côté la plus grande
+        dimension des boites englobantes des voitures : seules les voitures d'une même cellule sont comparées, en temps
+        quasi linéaire. Renvoie les mêmes couples que ``naive_broad_phase``, dans le même ordre.
+
+        Les voitures sans voiture d'une route en conflit avec la leur sont d'abord écartées (voir
+        ``RoadConflicts.cars_with_partners``), et s'il en reste moins de ``sc.grid_min_cars``, la recherche naïve, moins
+        coûteuse pour peu de voitures, est utilisée."""
+        if road_conflicts is not None:
+            cars = road_conflicts.cars_with_partners(cars)
+
+        if len(cars) < sc.grid_min_cars:
+            return Simulation.naive_broad_phase(cars, road_conflicts)
+
+        aabbs = npa([car.aabb for car in cars])
+        cell_size = max((aabbs[:, 1] - aabbs[:, 0]).max(), 1)
+        i, j = grid_candidate_pairs(aabbs, cell_size)
+
+        return Simulation.close_pairs(cars, i, j, road_conflicts)
 
-        # contruction des couples
+    def sweep_and_prune_broad_phase(self, cars: list[Car]):
+        """Phase "broad" incrémentale par balayage (voir ``SweepAndPrune``), qui profite de ce que les voitures bougent
+        peu d'une image à l'autre. Renvoie les mêmes couples que ``naive_broad_phase``, dans le même ordre."""
+        i, j = self.sweep_and_prune.candidate_pairs(cars)
+
+        return Simulation.close_pairs(cars, i, j, self.road_conflicts)
+
+    @staticmethod
+    def close_pairs(cars: list[Car], i: NDArray, j: NDArray, road_conflicts: RoadConflicts | None = None):
+        """Renvoie les couples de voitures ``(cars[i[k]], cars[j[k]])`` assez proches pour interagir, et dont les routes
+        sont en conflit selon ``road_conflicts`` s'il est donné."""
+        if i.size and road_conflicts is not None:
+            conflicting = road_conflicts.mask(cars, i, j)
+            i, j = i[conflicting], j[conflicting]
+
+        if not i.size:
+            return []
+
+        attrs = npa([(car.length, car.delta_d_min, car.v, car.t_react) for car in cars])
+        length, delta_d_min, v, t_react = attrs.T
+        max_size = length / 2 + delta_d_min / 2 + v * t_react
+        centers = npa([car.pos for car in cars])
+        dist = np.linalg.norm(centers[j] - centers[i], axis=1)
+        close = dist < max_size[i] + max_size[j]
+
+        return [(cars[k], cars[l]) for k, l in zip(i[close].tolist(), j[close].tolist())]
+
+    @staticmethod
+    def naive_broad_phase(cars: list[Car], road_conflicts: RoadConflicts | None = None):
+        """Phase "broad" comparant tous les couples de voitures, en temps quadratique. Si ``road_conflicts`` est donné,
+        les couples de voitures de routes qui ne sont pas en conflit sont ignorés."""
         pair_of_cars = []
         already_seen_pairs = {}  # couples d'identifiants déjà rencontrés
         for car1 in cars:
@@ -710,6 +1011,10 @@ class Simulation:
                 already_seen_pairs[(car1.id, car2.id)] = True
                 already_seen_pairs[(car2.id, car1.id)] = True
 
+                if road_conflicts is not None and not road_conflicts.conflicting(car1, car2):
+                    # si les routes des voitures ne se croisent pas, aucune chance d'interaction
+                    continue
+
                 dist = distance(car1.pos, car2.pos)
                 car1_max_size = car1.length / 2 + car1.delta_d_min / 2 + car1.v * car1.t_react
                 car2_max_size = car2.length / 2 + car2.delta_d_min / 2 + car2.v * car2.t_react
@@ -734,29 +1039,74 @@ class Simulation:
 
         return pair_of_cars
 
+    @staticmethod
+    def manage_cars_interactions(pairs: list[tuple[Car, Car]]):
+        """Version vectorisée de ``manage_cars_interaction`` pour tous les couples de ``pairs`` à la fois : les tests de
+        séparation des zones de collision sont faits en une fois avec NumPy, seules les priorités étant déterminées
+        couple par couple. Les côtés des zones de collision sont alignés avec les routes, sauf les côtés obliques de la
+        zone devant, qui dépendent de la vitesse : les normales des premiers sont celles mises en cache dans chaque
+        route (``Road.sat_axes``), seules celles des seconds sont calculées."""
+        if not pairs:
+            return
+
+        # géométrie de chaque voiture concernée, récupérée une seule fois
+        index = {}
+        for pair in pairs:
+            for car in pair:
+                index.setdefault(car, len(index))
+        front_bumper_hitboxes = npa([car.front_bumper_hitbox for car in index])
+        side_bumper_hurtboxes = npa([car.side_bumper_hurtbox for car in index])
+        road_axes = npa([car.road.sat_axes for car in index])
+        front_axes = edge_normals(front_bumper_hitboxes)[:, 1::2]  # normales aux côtés obliques de la zone devant
+
+        i = npa([index[car1] for car1, _ in pairs])
+        j = npa([index[car2] for _, car2 in pairs])
+        axes1 = np.concatenate((road_axes[i], front_axes[i]), axis=1)  # axes pour la zone devant de car1
+        axes2 = np.concatenate((road_axes[j], front_axes[j]), axis=1)  # axes pour la zone devant de car2
+
+        c1mcwc2 = do_polygons_intersect_batch(front_bumper_hitboxes[i], side_bumper_hurtboxes[j],
+                                              np.concatenate((axes1, road_axes[j]), axis=1))
+        c2mcwc1 = do_polygons_intersect_batch(front_bumper_hitboxes[j], side_bumper_hurtboxes[i],
+                                              np.concatenate((axes2, road_axes[i]), axis=1))
+        c1mcw2 = do_polygons_intersect_batch(front_bumper_hitboxes[i], front_bumper_hitboxes[j],
+                                             np.concatenate((axes1, axes2), axis=1))
+
+        for (car1, car2), c1_hits_c2, c2_hits_c1, c1_meets_c2 in zip(pairs, c1mcwc2, c2mcwc1, c1mcw2):
+            if c1_hits_c2 and c2_hits_c1 or not (c1_hits_c2 or c2_hits_c1) and c1_meets_c2:
+                if car1.has_priority_over(car2):
+                    car2.add_soon_colliding_car(car1)
+                else:
+                    car1.add_soon_colliding_car(car2)
+
+            elif c1_hits_c2:
+                car1.add_soon_colliding_car(car2)
+
+            elif c2_hits_c1:
+                car2.add_soon_colliding_car(car1)
+
     @staticmethod
     def manage_cars_interaction(car1: Car, car2: Car):
         """Détermine quelle interaction deux voitures ont entre elles, c'est-à-dire s'il l'une va rentrer dans l'autre,
         si elle vont toutes les deux se percuter et qui a la priorité sur qui. Met à jour la liste
-        ``soon_colliding_cars`` de la voiture concernée. Correspond à la phase "narrow" dans la détection de
+        ``soon_colliding_cars`` de la voiture concernée (voir ``Car.add_soon_colliding_car``). Correspond à la phase "narrow" dans la détection de
         collisions."""
         c1mcwc2 = car1.may_collide_with(car2)
         c2mcwc1 = car2.may_collide_with(car1)
 
         if c1mcwc2 and c2mcwc1:
             if car1.has_priority_over(car2):
-                car2.soon_colliding_cars.append(car1)
+                car2.add_soon_colliding_car(car1)
             else:
-                car1.soon_colliding_cars.append(car2)
+                car1.add_soon_colliding_car(car2)
 
         elif c1mcwc2:
-            car1.soon_colliding_cars.append(car2)
+            car1.add_soon_colliding_car(car2)
 
         elif c2mcwc1:
-            car2.soon_colliding_cars.append(car1)
+            car2.add_soon_colliding_car(car1)
 
         elif car1.might_collide_with(car2):
             if car1.has_priority_over(car2):
-                car2.soon_colliding_cars.append(car1)
+                car2.add_soon_colliding_car(car1)
             else:
-                car1.soon_colliding_cars.append(car2)
+                car1.add_soon_colliding_car(car2)